@@ -6,3 +6,4 @@ Caleb Levy, 2015.
 from .frozendict import frozendict
 from ._tuple import Tuple
 from .enumerable import Enumerable, typecheck
+from .hamt import PersistentMapping
@@ -4,8 +4,10 @@ Caleb Levy, 2015.
 """
 
 from abc import abstractmethod, ABCMeta
+from collections import Counter
+from itertools import islice
 
-from funcstructs.compat import with_metaclass
+from funcstructs.compat import with_metaclass, is_index
 from funcstructs.bases.parametrized import ParamMeta
 
 
@@ -62,6 +64,11 @@ class ImmutableStruct(Struct, WriteOnceMixin):
 class Enumerable(with_metaclass(ParametrizedABCMeta, ImmutableStruct)):
     """Abstract enumerators for collections of objects parametrized by
     a finite number of variables.
+
+    Subclasses which can find their kth element directly should define
+    unrank(k), which makes them indexable and sliceable. Subclasses with
+    faster ways to count or step through their elements should override
+    cardinality and _iter_range.
     """
     # TODO: describing differences between this and Sequence, Set, Iterable:
     #   - Should have quick containment testing
@@ -76,6 +83,67 @@ class Enumerable(with_metaclass(ParametrizedABCMeta, ImmutableStruct)):
         return
         yield
 
+    def cardinality(self):
+        """Number of elements of self, counted by enumeration."""
+        return sum(1 for _ in self)
+
+    def _iter_range(self, start, stop):
+        """Generate the elements of self at positions start to stop."""
+        return islice(self, start, max(start, stop))
+
+    def __getitem__(self, index):
+        """e[k] <==> list(e)[k], for enumerables defining unrank. Slices
+        return lists."""
+        if not hasattr(self, 'unrank'):
+            raise TypeError("%s objects are not indexable" %
+                            type(self).__name__)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.cardinality())
+            if step == 1:
+                return list(self._iter_range(start, stop))
+            return [self.unrank(k) for k in range(start, stop, step)]
+        if not is_index(index):
+            raise TypeError("%s indices must be integers, not %s" % (
+                type(self).__name__, type(index).__name__))
+        size = self.cardinality()
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("%s index out of range" % type(self).__name__)
+        return self.unrank(index)
+
+    def chunks(self, size):
+        """Generate the elements of self in order, in lists of size
+        elements, except possibly the last."""
+        if size < 1:
+            raise ValueError("chunk size must be positive")
+        if self._iter_range.__code__ is not Enumerable._iter_range.__code__:
+            # Subclasses which step through ranges of elements directly may
+            # make each chunk from its own range.
+            count = self.cardinality()
+            for start in range(0, count, size):
+                yield list(self._iter_range(start, min(start+size, count)))
+            return
+        elements = iter(self)
+        while True:
+            chunk = list(islice(elements, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def shard(self, i, nshards):
+        """Generate the ith of nshards contiguous, nearly equal parts of
+        self, so that the shards for i in range(nshards) together enumerate
+        self in order."""
+        if not 0 <= i < nshards:
+            raise ValueError("Shard %s is not in range(%s)" % (i, nshards))
+        size = self.cardinality()
+        return self._iter_range(size*i//nshards, size*(i+1)//nshards)
+
+    def count_by(self, key):
+        """Counter of the values of key over the elements of self."""
+        return Counter(map(key, self))
+
 
 def typecheck(*types):
     """Wrap a __contains__ method to check it its input is in types."""
@@ -4,7 +4,7 @@ Caleb Levy, 2015.
 """
 
 from collections import Mapping as _Mapping
-from functools import partial as _partial
+from functools import partial as _partial, wraps as _wraps
 from types import FunctionType as _FunctionType
 
 __all__ = ["frozendict"]
@@ -33,6 +33,12 @@ __all__ = ["frozendict"]
 # MappingProxyType in design, its code ends up looking similar to
 # CPython: define a type struct referencing another object and bolt on
 # methods for it.
+#
+# A second hidden slot holds a cache of values derived from the mapping,
+# such as hashes. Subclasses opt in to caching a method by decorating it
+# with _cached. Since the mapping never changes after __new__, and the
+# cache is only reachable through _cache_accessors, cached values can
+# never go stale.
 
 
 class frozendict(object):
@@ -40,7 +46,8 @@ class frozendict(object):
     with tuples, may still be mutable. If all of frozendict's values
     are hashable, then so is frozendict."""
 
-    __slots__ = '_mapping'  # allocate slot for iternal dict
+    # allocate slots for internal dict and cache of derived values
+    __slots__ = '_mapping', '_cache'
 
 
 # Store accessor and setter for the member descriptor.
@@ -55,6 +62,12 @@ def _map_accessors(_map_set=frozendict._mapping.__set__,
     return _map_set, _map_get
 
 
+@_partial
+def _cache_accessors(_cache_set=frozendict._cache.__set__,
+                     _cache_get=frozendict._cache.__get__):
+    return _cache_set, _cache_get
+
+
 # Define all methods inside _FrozendictHelper so that all references to the
 # helper functions are internal to the function body, and not module level
 # exports. This also wraps map_get and map_set inside closure cells so that
@@ -66,6 +79,7 @@ def _map_accessors(_map_set=frozendict._mapping.__set__,
 def _FrozendictHelper():
     """Add wrappers for `dict`'s methods to frozendict."""
     del frozendict._mapping  # destroy external access to the mapping
+    del frozendict._cache
     del frozendict.__slots__  # make it look like a builtin type
 
     map_set, map_get = _map_accessors()
@@ -259,3 +273,22 @@ def _FrozendictHelper():
             return map_get(self).__sizeof__()
 
     _Mapping.register(frozendict)
+
+
+def _cached(method):
+    """Decorator caching the result of a frozendict method taking no
+    arguments, computing it on first call. Results are cached per method,
+    so an overriding method may safely call a cached super method."""
+    cache_set, cache_get = _cache_accessors()
+
+    @_wraps(method)
+    def cached_method(self):
+        try:
+            return cache_get(self)[method]
+        except AttributeError:
+            cache_set(self, {})
+        except KeyError:
+            pass
+        value = cache_get(self)[method] = method(self)
+        return value
+    return cached_method
@@ -0,0 +1,280 @@
+"""Persistent mapping using a hash array mapped trie.
+
+Caleb Levy, 2015.
+"""
+
+from collections import Mapping, ItemsView, KeysView, ValuesView
+
+__all__ = ["PersistentMapping"]
+
+# A hash array mapped trie (HAMT) stores each key in a tree whose branches
+# are selected by successive 5 bit chunks of the key's hash. Each node
+# holds a bitmap of its occupied branches and a compact tuple of entries,
+# so looking up a key takes O(log n) steps and little memory.
+#
+# Nodes are never modified after creation. Setting a key copies only the
+# nodes along the path to it, sharing every other node with the original
+# trie, so deriving a mapping which differs at a few keys is cheap.
+#
+# Entries are either leaves, stored as (hash, key, value) tuples, or
+# subnodes. Keys whose hashes agree in all bits are stored together in a
+# _Collision node.
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _popcount(n):
+    return bin(n).count('1')
+
+
+class _Node(object):
+    __slots__ = 'bitmap', 'entries'
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _Collision(object):
+    __slots__ = 'hash', 'entries'
+
+    def __init__(self, h, entries):
+        self.hash = h
+        self.entries = entries
+
+
+_EMPTY = _Node(0, ())
+
+
+def _entry_hash(entry):
+    return entry[0] if type(entry) is tuple else entry.hash
+
+
+def _merge(shift, a, b):
+    """Node holding leaves or collisions a and b with different hashes,
+    whose hashes agree below shift."""
+    ia = (_entry_hash(a) >> shift) & _MASK
+    ib = (_entry_hash(b) >> shift) & _MASK
+    if ia == ib:
+        return _Node(1 << ia, (_merge(shift+_BITS, a, b), ))
+    return _Node((1 << ia) | (1 << ib), (a, b) if ia < ib else (b, a))
+
+
+def _build(leaves, shift):
+    """Node holding a list of leaves whose hashes agree below shift."""
+    if shift >= 64:
+        return _Collision(leaves[0][0], tuple(leaves))
+    branches = {}
+    for leaf in leaves:
+        branches.setdefault((leaf[0] >> shift) & _MASK, []).append(leaf)
+    bitmap = 0
+    entries = []
+    for i in sorted(branches):
+        bitmap |= 1 << i
+        branch = branches[i]
+        if len(branch) == 1:
+            entries.append(branch[0])
+        else:
+            entries.append(_build(branch, shift+_BITS))
+    return _Node(bitmap, tuple(entries))
+
+
+def _set(node, shift, leaf):
+    """Return (new node, whether the key of leaf was added)."""
+    h, key, value = leaf
+    if type(node) is _Collision:
+        if node.hash != h:
+            return _merge(shift, node, leaf), True
+        for i, (_, k, v) in enumerate(node.entries):
+            if k is key or k == key:
+                entries = node.entries[:i] + (leaf, ) + node.entries[i+1:]
+                return _Collision(h, entries), False
+        return _Collision(h, node.entries + (leaf, )), True
+    bit = 1 << ((h >> shift) & _MASK)
+    i = _popcount(node.bitmap & (bit - 1))
+    entries = node.entries
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit,
+                     entries[:i] + (leaf, ) + entries[i:]), True
+    entry = entries[i]
+    if type(entry) is tuple:
+        if entry[0] == h and (entry[1] is key or entry[1] == key):
+            new, added = leaf, False
+        elif entry[0] == h:
+            new, added = _Collision(h, (entry, leaf)), True
+        else:
+            new, added = _merge(shift+_BITS, entry, leaf), True
+    else:
+        new, added = _set(entry, shift+_BITS, leaf)
+    return _Node(node.bitmap, entries[:i] + (new, ) + entries[i+1:]), added
+
+
+def _leaves(node):
+    """Generate the leaves of a trie."""
+    stack = [iter(node.entries)]
+    while stack:
+        for entry in stack[-1]:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                stack.append(iter(entry.entries))
+                break
+        else:
+            stack.pop()
+
+
+class _KeysView(KeysView):
+    __slots__ = ()
+
+    def __iter__(self):
+        for leaf in _leaves(self._mapping._root):
+            yield leaf[1]
+
+
+class _ItemsView(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        for leaf in _leaves(self._mapping._root):
+            yield leaf[1], leaf[2]
+
+
+class _ValuesView(ValuesView):
+    __slots__ = ()
+
+    def __iter__(self):
+        for leaf in _leaves(self._mapping._root):
+            yield leaf[2]
+
+
+_missing = object()
+
+
+class PersistentMapping(Mapping):
+    """Immutable mapping whose set and update methods return new mappings
+    sharing structure with the original, in O(log n) time per key.
+
+    >>> m = PersistentMapping({'a': 1, 'b': 2})
+    >>> m2 = m.set('c', 3)
+    >>> m2 == {'a': 1, 'b': 2, 'c': 3}
+    True
+    >>> 'c' in m
+    False
+    """
+
+    __slots__ = '_root', '_len'
+
+    def __init__(self, items=()):
+        if isinstance(items, PersistentMapping):
+            self._root = items._root
+            self._len = items._len
+            return
+        if isinstance(items, Mapping):
+            items = items.items()
+        # Later values take precedence, as in dict.
+        leaves = dict(((_hash(k), k), v) for k, v in items)
+        self._len = len(leaves)
+        if leaves:
+            self._root = _build([(h, k, v) for (h, k), v in leaves.items()],
+                                0)
+        else:
+            self._root = _EMPTY
+
+    def _derive(self, root, length):
+        """New instance of the same type with the given trie."""
+        new = object.__new__(self.__class__)
+        new._root = root
+        new._len = length
+        return new
+
+    def set(self, key, value):
+        """Return a new mapping with key mapped to value."""
+        root, added = _set(self._root, 0, (_hash(key), key, value))
+        return self._derive(root, self._len + added)
+
+    def update(self, items):
+        """Return a new mapping with the keys and values of items, which
+        may be a mapping or an iterable of pairs, set in order."""
+        if isinstance(items, Mapping):
+            items = items.items()
+        new = self
+        for key, value in items:
+            new = new.set(key, value)
+        return new
+
+    def get(self, key, default=None):
+        h = _hash(key)
+        node = self._root
+        shift = 0
+        while True:
+            if type(node) is _Collision:
+                if node.hash == h:
+                    for _, k, v in node.entries:
+                        if k is key or k == key:
+                            return v
+                return default
+            bit = 1 << ((h >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return default
+            entry = node.entries[_popcount(node.bitmap & (bit - 1))]
+            if type(entry) is tuple:
+                if entry[0] == h and (entry[1] is key or entry[1] == key):
+                    return entry[2]
+                return default
+            node = entry
+            shift += _BITS
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __iter__(self):
+        for leaf in _leaves(self._root):
+            yield leaf[1]
+
+    def __len__(self):
+        return self._len
+
+    def keys(self):
+        return _KeysView(self)
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    if hasattr(dict, 'itervalues'):
+        viewkeys = keys
+        viewitems = items
+        viewvalues = values
+
+        def iterkeys(self):
+            return iter(self.keys())
+
+        def iteritems(self):
+            return iter(self.items())
+
+        def itervalues(self):
+            return iter(self.values())
+
+    def copy(self):
+        """Return a dict with the same items."""
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return (self.__class__, (self.copy(), ))
@@ -3,33 +3,35 @@
 Caleb Levy, 2015.
 """
 
-from math import factorial
 from itertools import product
 
-from funcstructs.utils import split
-from funcstructs.structures.multiset import (
-    Multiset,
-    _prod as prod,
-    _factorial_prod as factorial_prod
+from funcstructs.structures.multiset import _prod as prod
+from funcstructs.combinat.factorials import (
+    factorial_table,
+    check_modulus,
+    factorial,
+    binomial,
+    multinomial,
+    factorial_prod
+)
+from funcstructs.combinat.primes import (
+    sieve,
+    prime_factorization,
+    divisors,
+    totient,
+    mobius
 )
 
 
 def nCk(n, k):
-    """n choose k == n!/k!/(n-k)!, optimized for large n and small k"""
-    return factorial(n)//factorial(k)//factorial(n-k)
+    """n choose k == n!/k!/(n-k)!, from the shared factorial table."""
+    return binomial(n, k)
 
 
 def multinomial_coefficient(partition, n=None):
     """The multinomial coefficient of n corresponding to partition [p1, ...,
     pk] is given by n!/(p1! *...* pk!)/(n-sum(partition))!"""
-    tot = 0
-    deg = 1
-    for p in partition:
-        tot += p
-        deg *= factorial(p)
-    if n is None:
-        n = tot
-    return factorial(n)//deg//factorial(n-tot)
+    return multinomial(partition, n)
 
 
 def nCWRk(n, r):
@@ -59,43 +61,6 @@ def productrange(*ranges):
     return product(*_ranges)
 
 
-# prime factorization
-
-
-def prime_factorization(n):
-    """Prime factorization of an integer n."""
-    # Code taken directly from "Prime factorization - list" at
-    # http://stackoverflow.com/a/16996439.
-    primfac = []
-    d = 2
-    while d*d <= n:
-        while (n % d) == 0:
-            primfac.append(d)  # supposing you want multiple factors repeated
-            n //= d
-        d += 1
-    if n > 1:
-        primfac.append(n)
-    return Multiset(primfac)
-
-
-def _divisor_gen(n):
-    """Generate divisors of n"""
-    # Refactoring of "What is the best way to get all the divisors of a number"
-    # at http://stackoverflow.com/a/171784.
-    if n == 1:
-        yield 1
-        return
-    primes, multiplicities = split(prime_factorization(n))
-    # Since factors are prime, each partition of powers is a different divisor.
-    for exponents in productrange(*[m+1 for m in multiplicities]):
-        yield prod(p**e for p, e in zip(primes, exponents))
-
-
-def divisors(n):
-    """Return all integer divisors n."""
-    return tuple(_divisor_gen(n))
-
-
 # Compositions
 
 
@@ -104,11 +69,13 @@ def binary_compositions(n):
     return productrange(*[2]*(n-1))
 
 
-def compositions(n):
-    """Enumerate ordered lists of positive integers summing to n."""
+def compositions(n, shared=False):
+    """Enumerate ordered lists of positive integers summing to n, in reverse
+    lexicographic order. If shared, the same list is yielded each time,
+    updated in place."""
     comp = [n]
     while comp:
-        yield comp
+        yield comp if shared else list(comp)
         j = len(comp)
         for k in range(j-1, -1, -1):
             # Keep descending (backwards) until hitting a component you can
@@ -121,23 +88,157 @@ def compositions(n):
             comp.pop()
 
 
-def weak_compositions(n, k):
-    """Enumerates the length k lists of non-negative integers summing to n.
-    Taken directly from http://dandrake.livejournal.com/83095.html."""
+def _part_bounds(n, k, bounds):
+    """Upper bounds for each of k parts summing to n."""
+    if bounds is None:
+        return [n]*k
+    bounds = [min(b, n) for b in bounds]
+    if len(bounds) != k:
+        raise ValueError("expected %s bounds, got %s" % (k, len(bounds)))
+    return bounds
+
+
+def weak_compositions(n, k, bounds=None, shared=False):
+    """Enumerates the length k lists of non-negative integers summing to n
+    in lexicographic order. If given, bounds[i] is the largest allowed
+    value of the ith part. If shared, the same list is yielded each time,
+    updated in place."""
     if n < 0 or k < 0:
         return
-    elif k == 0:
-        # the empty sum, by convention, is zero, so only return something if
-        # n is zero
-        if n == 0:
-            yield []
-        return
-    elif k == 1:
-        yield [n]
+    bounds = _part_bounds(n, k, bounds)
+    if sum(bounds) < n:
         return
-    else:
-        # For each first integer i in range(n+1), list all compositions
-        # on n-i nodes, of length at most k-1.
-        for i in range(n+1):
-            for comp in weak_compositions(n-i, k-1):
-                yield [i] + comp
+    # The lexicographically least composition puts as much as possible in
+    # the last parts.
+    comp = [0]*k
+    r = n
+    for i in range(k-1, -1, -1):
+        comp[i] = min(bounds[i], r)
+        r -= comp[i]
+    while True:
+        yield comp if shared else list(comp)
+        # Find the last part which may be incremented by taking from the
+        # parts after it, which are then refilled from the back.
+        j = k - 2
+        s = comp[-1] if k else 0
+        while j >= 0 and (not s or comp[j] == bounds[j]):
+            s += comp[j]
+            j -= 1
+        if j < 0:
+            return
+        comp[j] += 1
+        s -= 1
+        for i in range(k-1, j, -1):
+            comp[i] = min(bounds[i], s)
+            s -= comp[i]
+
+
+# Counting and ranking compositions
+# =================================
+# The compositions of m following one beginning with the part p are those
+# beginning with a larger part. Since m has 2**(m-1) compositions, the
+# compositions of m with first part greater than p number 2**(m-p-1).
+# Weak compositions are ranked with a table of the counts of compositions
+# of each number into each suffix of the parts.
+
+
+def rank_composition(composition):
+    """Return the position of a composition in the enumeration of
+    compositions(sum(composition))."""
+    m = sum(composition)
+    rank = 0
+    for part in composition:
+        if part < 1:
+            raise ValueError("%r is not a composition" % (composition, ))
+        m -= part
+        if m:
+            rank += 1 << (m-1)
+    return rank
+
+
+def unrank_composition(n, rank):
+    """Return the composition at position rank in the enumeration of
+    compositions(n), as a new list."""
+    if n < 1 or not 0 <= rank < 1 << (n-1):
+        raise IndexError("composition index out of range")
+    composition = []
+    m = n
+    while m:
+        # The compositions of m whose first part exceeds part come first.
+        part = m
+        while part > 1 and rank >= 1 << (m-part):
+            part -= 1
+        if part < m:
+            rank -= 1 << (m-part-1)
+        composition.append(part)
+        m -= part
+    return composition
+
+
+def _weak_composition_table(n, bounds):
+    """Table whose [i][m] entry is the number of weak compositions of m
+    into the parts after the first i."""
+    k = len(bounds)
+    table = [[0]*(n+1) for _ in range(k+1)]
+    table[k][0] = 1
+    for i in range(k-1, -1, -1):
+        after = table[i+1]
+        row = table[i]
+        b = bounds[i]
+        # Running sum of after[m-b..m].
+        s = 0
+        for m in range(n+1):
+            s += after[m]
+            if m > b:
+                s -= after[m-b-1]
+            row[m] = s
+    return table
+
+
+def weak_composition_count(n, k, bounds=None):
+    """Number of weak compositions of n into k parts, each no larger than
+    the corresponding bound if given."""
+    if n < 0 or k < 0:
+        return 0
+    if bounds is None:
+        return nCk(n+k-1, k-1) if k else int(n == 0)
+    return _weak_composition_table(n, _part_bounds(n, k, bounds))[0][n]
+
+
+def rank_weak_composition(composition, bounds=None):
+    """Return the position of composition in the enumeration of
+    weak_compositions(sum(composition), len(composition), bounds)."""
+    n = sum(composition)
+    bounds = _part_bounds(n, len(composition), bounds)
+    table = _weak_composition_table(n, bounds)
+    rank = 0
+    m = n
+    for i, part in enumerate(composition):
+        if not 0 <= part <= bounds[i]:
+            raise ValueError("%r is not a weak composition within %r" % (
+                composition, bounds))
+        after = table[i+1]
+        for v in range(part):
+            rank += after[m-v]
+        m -= part
+    return rank
+
+
+def unrank_weak_composition(n, k, rank, bounds=None):
+    """Return the weak composition at position rank in the enumeration of
+    weak_compositions(n, k, bounds), as a new list."""
+    bounds = _part_bounds(max(n, 0), max(k, 0), bounds)
+    table = _weak_composition_table(max(n, 0), bounds)
+    if n < 0 or k < 0 or not 0 <= rank < table[0][n]:
+        raise IndexError("weak composition index out of range")
+    composition = []
+    m = n
+    for i in range(k):
+        after = table[i+1]
+        v = 0
+        while rank >= after[m-v]:
+            rank -= after[m-v]
+            v += 1
+        composition.append(v)
+        m -= v
+    return composition
@@ -0,0 +1,217 @@
+"""Cached tables of factorials and binomial coefficients.
+
+Counting functions throughout funcstructs take factorials of the same
+small arguments many times over. The shared tables here store each
+factorial the first time it is needed, so that later lookups are list
+indexing. Tables may also work modulo a prime, in which case they store
+inverse factorials as well.
+
+Caleb Levy, 2015.
+"""
+
+from math import factorial as _factorial
+
+__all__ = [
+    "FactorialTable", "factorial_table", "check_modulus", "factorial",
+    "binomial", "multinomial", "factorial_prod"
+]
+
+
+def _is_prime(n):
+    """Primality of n by trial division."""
+    if n < 4:
+        return n > 1
+    if not n % 2:
+        return False
+    d = 3
+    while d*d <= n:
+        if not n % d:
+            return False
+        d += 2
+    return True
+
+
+class FactorialTable(object):
+    """Growable table of factorials, exact or modulo a prime mod.
+
+    Exact factorials are stored up to limit, and computed directly beyond
+    it, since the table would otherwise take space quadratic in its size.
+    The hits and misses attributes count factorial lookups which were and
+    were not already in the table.
+
+    >>> t = FactorialTable(mod=7)
+    >>> t.factorial(4), t.binomial(10, 3), t.inverse_factorial(3)
+    (3, 1, 6)
+    """
+
+    def __init__(self, mod=None, limit=None):
+        # Inverses come from Fermat's little theorem, and binomials from
+        # Lucas' theorem, both of which need a prime modulus.
+        if mod is not None and not _is_prime(mod):
+            raise ValueError("modulus must be a prime")
+        self.mod = mod
+        self.limit = limit
+        self._fac = [1]
+        self._inv = [1]
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self):
+        """Largest n whose factorial is in the table."""
+        return len(self._fac) - 1
+
+    def extend(self, n):
+        """Grow the table to hold the factorials of every integer up to n,
+        or as many of them as the table may hold."""
+        fac = self._fac
+        start = len(fac)
+        mod = self.mod
+        if mod is None:
+            if self.limit is not None:
+                n = min(n, self.limit)
+            f = fac[-1]
+            for i in range(start, n+1):
+                f *= i
+                fac.append(f)
+            return
+        # Every factorial from mod! on is 0.
+        n = min(n, mod-1)
+        if n < start:
+            return
+        f = fac[-1]
+        for i in range(start, n+1):
+            f = f*i % mod
+            fac.append(f)
+        # One modular inversion gives the new inverse factorials by
+        # working downwards, since 1/(i-1)! = i/i!.
+        inv = [0]*(n+1-start)
+        g = pow(f, mod-2, mod)
+        for i in range(n, start-1, -1):
+            inv[i-start] = g
+            g = g*i % mod
+        self._inv.extend(inv)
+
+    def factorial(self, n):
+        """n!, modulo mod if the table is modular."""
+        fac = self._fac
+        if n < len(fac):
+            if n < 0:
+                raise ValueError("factorial() not defined for negative values")
+            self.hits += 1
+            return fac[n]
+        self.misses += 1
+        if self.mod is not None and n >= self.mod:
+            return 0
+        self.extend(n)
+        if n < len(fac):
+            return fac[n]
+        return _factorial(n)
+
+    def inverse_factorial(self, n):
+        """Modular inverse of n!, for n less than the modulus."""
+        if self.mod is None:
+            raise ValueError("inverse factorials require a modulus")
+        if not 0 <= n < self.mod:
+            raise ValueError("%s! is not invertible modulo %s" % (n, self.mod))
+        inv = self._inv
+        if n >= len(inv):
+            self.extend(n)
+        return inv[n]
+
+    def inverse(self, n):
+        """Modular inverse of n, for n not divisible by the modulus."""
+        if self.mod is None:
+            raise ValueError("inverses require a modulus")
+        n %= self.mod
+        if not n:
+            raise ValueError("0 is not invertible modulo %s" % self.mod)
+        return self.factorial(n-1) * self.inverse_factorial(n) % self.mod
+
+    def binomial(self, n, k):
+        """n choose k, which is 0 unless 0 <= k <= n."""
+        if k < 0 or k > n:
+            return 0
+        factorial = self.factorial
+        mod = self.mod
+        if mod is None:
+            return factorial(n)//(factorial(k)*factorial(n-k))
+        # Lucas' theorem: n choose k is the product of the binomials of
+        # their base mod digits.
+        inverse = self.inverse_factorial
+        count = 1
+        while n:
+            n, a = divmod(n, mod)
+            k, b = divmod(k, mod)
+            if b > a:
+                return 0
+            count = count * factorial(a) * inverse(b) * inverse(a-b) % mod
+        return count
+
+    def multinomial(self, partition, n=None):
+        """n!/(p1! *...* pk!)/(n-sum(partition))!, which is 0 if n is less
+        than the sum of the partition."""
+        mod = self.mod
+        if mod is None:
+            factorial = self.factorial
+            tot = 0
+            deg = 1
+            for p in partition:
+                tot += p
+                deg *= factorial(p)
+            if n is None:
+                n = tot
+            if n < tot:
+                return 0
+            return factorial(n)//deg//factorial(n-tot)
+        # Modulo a prime the multinomial coefficient is a product of
+        # binomials, each of which Lucas' theorem handles.
+        binomial = self.binomial
+        tot = 0
+        count = 1
+        for p in partition:
+            tot += p
+            count = count * binomial(tot, p) % mod
+        if n is not None:
+            count = count * binomial(n, tot) % mod
+        return count
+
+    def factorial_prod(self, iterable):
+        """Product of the factorials of the elements in an iterable."""
+        factorial = self.factorial
+        mod = self.mod
+        prod = 1
+        if mod is None:
+            for n in iterable:
+                prod *= factorial(n)
+        else:
+            for n in iterable:
+                prod = prod * factorial(n) % mod
+        return prod
+
+
+_tables = {None: FactorialTable(limit=2048)}
+
+
+def factorial_table(mod=None):
+    """The shared FactorialTable modulo mod, or of exact factorials if mod
+    is None."""
+    try:
+        return _tables[mod]
+    except KeyError:
+        return _tables.setdefault(mod, FactorialTable(mod))
+
+
+def check_modulus(mod, n):
+    """Raise ValueError unless mod is a prime greater than n, so that every
+    positive integer up to n is invertible modulo mod."""
+    # Making the shared table checks that mod is prime, once for each mod.
+    factorial_table(mod)
+    if mod <= n:
+        raise ValueError("modulus must be a prime greater than %s" % n)
+
+
+factorial = _tables[None].factorial
+binomial = _tables[None].binomial
+multinomial = _tables[None].multinomial
+factorial_prod = _tables[None].factorial_prod
@@ -0,0 +1,274 @@
+"""Enumerating, counting and ranking integer partitions.
+
+Partitions are represented as non-increasing lists of positive integers.
+For speed, the generators in this module yield the same list each time,
+updated in place; copy it if it must outlive the next step.
+
+Caleb Levy, 2014 and 2015.
+"""
+
+import itertools
+
+__all__ = [
+    "partitions", "fixed_length_partitions", "max_length_partitions",
+    "multiplicities", "multiplicity_partitions", "partition_number",
+    "partition_numbers_upto", "rank_partition", "unrank_partition"
+]
+
+
+def isqrt(n):
+    """Returns the integer square root of n; i.e. r=isqrt(n) is the greatest
+    integer such that r**2<=n. Code taken directly from "Integer square root in
+    python" at http://stackoverflow.com/a/15391420."""
+    x = n
+    y = (x + 1) // 2
+    while y < x:
+        x = y
+        y = (x + n // x) // 2
+    return x
+
+
+# Enumeration
+# ===========
+
+
+def partitions(n):
+    """Partitions of n in reverse lexicographic order, from [n] down to
+    [1]*n. The same list is yielded each time, updated in place."""
+    # Algorithm ZS1 from Zoghbi, A. and Stojmenovic, I., "Fast Algorithms for
+    # Generating Integer Partitions", International Journal of Computer
+    # Mathematics, 1998. h is the index of the last part greater than 1, so
+    # each step only touches the parts at and after h.
+    if n < 0:
+        return
+    if n == 0:
+        yield []
+        return
+    a = [n]
+    h = 0 if n > 1 else -1
+    while True:
+        yield a
+        if h < 0:
+            return
+        if a[h] == 2:
+            a[h] = 1
+            a.append(1)
+            h -= 1
+        else:
+            r = a[h] - 1
+            # Units freed: one from a[h], plus each trailing 1.
+            t = len(a) - h
+            a[h] = r
+            del a[h+1:]
+            while t >= r:
+                a.append(r)
+                h += 1
+                t -= r
+            if t:
+                a.append(t)
+                if t > 1:
+                    h += 1
+
+
+def fixed_length_partitions(n, k):
+    """Partitions of n into exactly k parts in colexicographic order. The
+    same list is yielded each time, updated in place."""
+    # Algorithm H from Knuth, "The Art of Computer Programming", Volume 4A,
+    # section 7.2.1.4, which Knuth credits to Hindenburg (1779).
+    if k == 0:
+        if n == 0:
+            yield []
+        return
+    if k == 1:
+        if n > 0:
+            yield [n]
+        return
+    if n < k:
+        return
+    a = [n-k+1] + [1]*(k-1)
+    while True:
+        yield a
+        if a[0] - 1 > a[1]:
+            a[0] -= 1
+            a[1] += 1
+            continue
+        j = 2
+        s = a[0] + a[1] - 1
+        while j < k and a[j] >= a[0] - 1:
+            s += a[j]
+            j += 1
+        if j >= k:
+            return
+        x = a[j] + 1
+        a[j] = x
+        j -= 1
+        while j > 0:
+            a[j] = x
+            s -= x
+            j -= 1
+        a[0] = s
+
+
+def max_length_partitions(n, k):
+    """Partitions of n into at most k parts, by increasing length. The same
+    list is yielded for each length, updated in place."""
+    if n == 0:
+        yield []
+        return
+    for l in range(1, min(n, k)+1):
+        for partition in fixed_length_partitions(n, l):
+            yield partition
+
+
+def multiplicities(partition):
+    """Return the (part, multiplicity) pairs of a non-increasing partition,
+    by decreasing part. Runs in one pass without hashing, so
+
+        Multiset.fromitems(multiplicities(partition)) == Multiset(partition)
+    """
+    items = []
+    for part, group in itertools.groupby(partition):
+        items.append((part, sum(1 for _ in group)))
+    return items
+
+
+def multiplicity_partitions(n):
+    """Partitions of n in multiplicity form, in the same order as
+    partitions(n). Yields (parts, mults) where parts are the distinct parts
+    in decreasing order and mults[i] is the number of times parts[i]
+    occurs. The same two lists are yielded each time, updated in place."""
+    # The multiplicity form of ZS1: each step takes one copy v of the
+    # smallest part other than 1, merges it with the trailing 1s, and
+    # redistributes them as copies of v-1 and a remainder. This only
+    # touches the last three distinct parts.
+    if n < 0:
+        return
+    if n == 0:
+        yield [], []
+        return
+    parts = [n]
+    mults = [1]
+    while True:
+        yield parts, mults
+        if parts[-1] == 1:
+            if len(parts) == 1:
+                return
+            parts.pop()
+            r = mults.pop()
+        else:
+            r = 0
+        v = parts[-1]
+        r += v
+        if mults[-1] == 1:
+            parts.pop()
+            mults.pop()
+        else:
+            mults[-1] -= 1
+        u = v - 1
+        parts.append(u)
+        mults.append(r//u)
+        r %= u
+        if r:
+            parts.append(r)
+            mults.append(1)
+
+
+# Counting
+# ========
+
+
+def partition_numbers_upto(n, mod=None):
+    """ Uses Euler's Pentagonal Number Theorem to count partition number using
+    the previous terms. The sum is taken over O(sqrt(n)) terms on each pass, so
+    the algorithm runs in O(n**3/2). See the Knoch paper in papers folder for a
+    proof of the theorem. If mod is given, the counts are reduced modulo mod.
+    """
+    if n == 0:
+        return [1]
+    pcounts = [1]+[0]*n
+    for m in range(1, n+1):
+        k_max = (isqrt(24*m+1)-1)//6
+        k_min = -((isqrt(24*m+1)+1)//6)
+        for k in itertools.chain(range(k_min, 0), range(1, k_max+1)):
+            pcounts[m] += (-1)**abs(k-1) * pcounts[m-k*(3*k+1)//2]
+        if mod is not None:
+            pcounts[m] %= mod
+    return pcounts
+
+
+def _bounded_partition_table(n, mod=None):
+    """Table whose [m][k] entry is the number of partitions of m into parts
+    no larger than k, for 0 <= m, k <= n, modulo mod if given."""
+    table = [[1]*(n+1)]
+    for m in range(1, n+1):
+        row = [0]*(n+1)
+        for k in range(1, n+1):
+            row[k] = row[k-1] + (table[m-k][k] if k <= m else 0)
+            if mod is not None:
+                row[k] %= mod
+        table.append(row)
+    return table
+
+
+def partition_number(n, k=None, mod=None):
+    """Number of partitions of n, or of partitions of n into exactly k parts
+    if k is given, modulo mod if given."""
+    if n < 0:
+        return 0
+    if k is None:
+        return partition_numbers_upto(n, mod)[-1]
+    if k < 0 or k > n:
+        return 0
+    if k == 0:
+        return int(n == 0)
+    # Removing the first column of a partition into k parts leaves a
+    # partition of n-k into at most k parts, whose conjugate has no part
+    # larger than k.
+    return _bounded_partition_table(n-k, mod)[n-k][min(k, n-k)]
+
+
+# Ranking
+# =======
+# In reverse lexicographic order, the partitions preceding p are those
+# which first differ from p by a larger part. If p[:i] sums to n-m, the
+# partitions beginning with p[:i] followed by a part in (p[i], p[i-1]]
+# are partitions of m with largest part in that range; there are
+# B(m, p[i-1]) - B(m, p[i]) of them, where B(m, k) counts partitions of m
+# with no part larger than k.
+
+
+def rank_partition(partition):
+    """Return the position of a partition in the enumeration of
+    partitions(sum(partition))."""
+    n = sum(partition)
+    table = _bounded_partition_table(n)
+    rank = 0
+    bound = m = n
+    for part in partition:
+        if part > bound or part < 1:
+            raise ValueError("%r is not a partition" % (partition, ))
+        rank += table[m][bound] - table[m][part]
+        bound = part
+        m -= part
+    return rank
+
+
+def unrank_partition(n, rank):
+    """Return the partition at position rank in the enumeration of
+    partitions(n), as a new list."""
+    table = _bounded_partition_table(max(n, 0))
+    if n < 0 or not 0 <= rank < table[n][n]:
+        raise IndexError("partition index out of range")
+    partition = []
+    bound = m = n
+    while m:
+        # There are B(m-part, part) partitions of m with largest part
+        # exactly part; skip past the blocks with larger largest parts.
+        part = min(bound, m)
+        while rank >= table[m-part][part]:
+            rank -= table[m-part][part]
+            part -= 1
+        partition.append(part)
+        bound = part
+        m -= part
+    return partition
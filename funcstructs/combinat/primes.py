@@ -0,0 +1,177 @@
+"""Factorizations, divisors and arithmetic functions from a shared sieve.
+
+Caleb Levy, 2015.
+"""
+
+from funcstructs.structures.multiset import Multiset
+
+__all__ = [
+    "FactorSieve", "sieve", "prime_factorization", "divisors", "totient",
+    "mobius"
+]
+
+
+# The sieve stores the smallest prime factor of every integer up to its
+# current size, so any such integer is factored by repeated division in
+# O(log n) steps. It grows by doubling the first time a larger integer is
+# queried, up to a fixed limit; integers beyond the limit are factored by
+# trial division until their cofactor falls within the sieve.
+
+
+def _isqrt(n):
+    x = n
+    y = (x + 1) // 2
+    while y < x:
+        x = y
+        y = (x + n // x) // 2
+    return x
+
+
+class FactorSieve(object):
+    """Smallest prime factor table which grows on demand up to limit, with
+    memoized divisors, totients and Mobius values for integers in range.
+
+    >>> s = FactorSieve(limit=100)
+    >>> s.divisors(12)
+    (1, 2, 3, 4, 6, 12)
+    >>> s.totient(12), s.mobius(30)
+    (4, -1)
+    """
+
+    def __init__(self, limit=1 << 20):
+        self.limit = limit
+        self._spf = [0, 1]
+        self._divisors = {}
+        self._totients = {}
+        self._mobius = {}
+
+    @property
+    def size(self):
+        """Largest integer currently in the table."""
+        return len(self._spf) - 1
+
+    def extend(self, n):
+        """Grow the table to cover every integer up to n."""
+        if n <= self.size:
+            return
+        size = max(n, min(self.limit, max(2*self.size, 1024)))
+        is_prime = [True]*(size+1)
+        for p in range(2, _isqrt(size)+1):
+            if is_prime[p]:
+                is_prime[p*p::p] = [False]*((size-p*p)//p + 1)
+        spf = list(range(size+1))
+        # Marking multiples by decreasing prime leaves each composite
+        # labelled by its smallest prime factor.
+        for p in range(_isqrt(size), 1, -1):
+            if is_prime[p]:
+                spf[p*p::p] = [p]*((size-p*p)//p + 1)
+        self._spf = spf
+
+    def _factors(self, n):
+        """List of (prime, exponent) pairs of n, by increasing prime."""
+        if n < 1:
+            raise ValueError("%s is not a positive integer" % n)
+        items = []
+        if n > self.limit:
+            d = 2
+            while d*d <= n and n > self.limit:
+                if n % d == 0:
+                    e = 0
+                    while n % d == 0:
+                        n //= d
+                        e += 1
+                    items.append((d, e))
+                d += 1
+            if n > self.limit:
+                items.append((n, 1))
+                return items
+        self.extend(n)
+        spf = self._spf
+        while n > 1:
+            p = spf[n]
+            e = 0
+            while spf[n] == p:
+                n //= p
+                e += 1
+            if items and items[-1][0] == p:
+                # Trial division stopped partway through the powers of p.
+                items[-1] = (p, items[-1][1] + e)
+            else:
+                items.append((p, e))
+        return items
+
+    def prime_factorization(self, n):
+        """Multiset of the prime factors of n."""
+        return Multiset.fromitems(self._factors(n))
+
+    def divisors(self, n):
+        """Tuple of the positive divisors of n in increasing order."""
+        try:
+            return self._divisors[n]
+        except KeyError:
+            pass
+        divs = [1]
+        for p, e in self._factors(n):
+            powers = divs
+            for _ in range(e):
+                powers = [d*p for d in powers]
+                divs = divs + powers
+        divs = tuple(sorted(divs))
+        if n <= self.limit:
+            self._divisors[n] = divs
+        return divs
+
+    def totient(self, n):
+        """Euler's totient: the number of k in range(1, n+1) coprime to n."""
+        try:
+            return self._totients[n]
+        except KeyError:
+            pass
+        phi = n
+        for p, _ in self._factors(n):
+            phi -= phi//p
+        if n <= self.limit:
+            self._totients[n] = phi
+        return phi
+
+    def mobius(self, n):
+        """Mobius function: 0 if n has a square factor, otherwise -1 to the
+        power of its number of prime factors."""
+        try:
+            return self._mobius[n]
+        except KeyError:
+            pass
+        mu = 1
+        for _, e in self._factors(n):
+            if e > 1:
+                mu = 0
+                break
+            mu = -mu
+        if n <= self.limit:
+            self._mobius[n] = mu
+        return mu
+
+
+# Shared by the counting functions throughout funcstructs; set sieve.limit
+# to change how far it may grow.
+sieve = FactorSieve()
+
+
+def prime_factorization(n):
+    """Prime factorization of an integer n."""
+    return sieve.prime_factorization(n)
+
+
+def divisors(n):
+    """Return all integer divisors of n in increasing order."""
+    return sieve.divisors(n)
+
+
+def totient(n):
+    """Euler's totient: the number of k in range(1, n+1) coprime to n."""
+    return sieve.totient(n)
+
+
+def mobius(n):
+    """Mobius function of n."""
+    return sieve.mobius(n)
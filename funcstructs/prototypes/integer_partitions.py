@@ -4,35 +4,26 @@ Caleb Levy, 2014 and 2015.
 """
 
 import collections
-import itertools
-
-from PADS import IntegerPartitions
 
+from funcstructs.combinat import partitions as _partitions
+from funcstructs.combinat.partitions import (
+    isqrt,
+    partition_numbers_upto,
+    partition_number
+)
 from funcstructs.structures import multiset
 
 
-def isqrt(n):
-    """Returns the integer square root of n; i.e. r=isqrt(n) is the greatest
-    integer such that r**2<=n. Code taken directly from "Integer square root in
-    python" at http://stackoverflow.com/a/15391420."""
-    x = n
-    y = (x + 1) // 2
-    while y < x:
-        x = y
-        y = (x + n // x) // 2
-    return x
-
-
-# Wrappers for Eppstein's modules returning multisets
+# Wrappers for funcstructs.combinat.partitions returning multisets
 def partitions(n):
-    """Wrapper for D Eppstein's partitions return multisets"""
-    for partition in IntegerPartitions.partitions(n):
+    """Partitions of n as multisets."""
+    for partition in _partitions.partitions(n):
         yield multiset.Multiset(partition)
 
 
 def fixed_length_partitions(n, w):
-    """Wrapper for D Eppstein's fixed_length_partitions returning multisets."""
-    for partition in IntegerPartitions.fixed_length_partitions(n, w):
+    """Partitions of n into w parts as multisets."""
+    for partition in _partitions.fixed_length_partitions(n, w):
         yield multiset.Multiset(partition)
 
 
@@ -40,7 +31,7 @@ def tuple_partitions(n):
     """Generates dictionaries with integer keys such that sum(i*d[i] for i in
     d.keys()) == n."""
     mults = collections.defaultdict(int)
-    for part in IntegerPartitions.partitions(n):
+    for part in _partitions.partitions(n):
         for p in part:
             mults[p] += 1
         yield mults
@@ -109,32 +100,7 @@ def fixed_lex_partitions(n, w):
         partition[w-j-k:], j = _min_part(s, j+k)
 
 
-def partition_numbers_upto(n):
-    """ Uses Euler's Pentagonal Number Theorem to count partition number using
-    the previous terms. The sum is taken over O(sqrt(n)) terms on each pass, so
-    the algorithm runs in O(n**3/2). See the Knoch paper in papers folder for a
-    proof of the theorem. """
-    if n == 0:
-        return [1]
-    pcounts = [1]+[0]*n
-    for m in range(1, n+1):
-        k_max = (isqrt(24*m+1)-1)//6
-        k_min = -((isqrt(24*m+1)+1)//6)
-        for k in itertools.chain(range(k_min, 0), range(1, k_max+1)):
-            pcounts[m] += (-1)**abs(k-1) * pcounts[m-k*(3*k+1)//2]
-    return pcounts
-
-
-def partition_number(n):
-    return partition_numbers_upto(n)[-1]
-
-
 def max_length_partitions(n, k):
     """Enumerate partitions of length less than or equal to k."""
-    if k >= n:
-        for part in partitions(n):
-            yield part
-    else:
-        for l in range(1, k+1):
-            for part in fixed_length_partitions(n, l):
-                yield part
+    for part in _partitions.max_length_partitions(n, k):
+        yield multiset.Multiset(part)
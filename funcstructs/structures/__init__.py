@@ -1,12 +1,19 @@
 # Main data structures
-from .conjstructs import ConjugacyClass, Funcstructs
+from .conjstructs import (
+    ConjugacyClass, are_conjugate, conjugating_bijection, StructureIndex,
+    Funcstructs, funcstruct_counts_upto
+)
 from .functions import (
     Function, Bijection, Endofunction, Permutation,
     identity, rangefunc, randfunc, randperm, randconj,
+    randfunc_array, randperm_array, randconj_array,
     Mappings, Isomorphisms, TransformationMonoid, SymmetricGroup
 )
-from .multiset import Multiset
-from .necklaces import periodicity, Necklace, FixedContentNecklaces
+from .multiset import Multiset, IntMultiset
+from .necklaces import (
+    periodicity, smallest_rotation, Necklace, FixedContentNecklaces
+)
 from .rootedtrees import (
-    LevelSequence, DominantSequence, RootedTree, TreeEnumerator
+    LevelSequence, DominantSequence, RootedTree, TreeEnumerator,
+    tree_counts_upto
 )
@@ -4,25 +4,33 @@ Caleb Levy, 2014-2015.
 """
 
 from collections import defaultdict
-from fractions import Fraction
 from itertools import chain, product, combinations_with_replacement
-from math import factorial
-
-from PADS import IntegerPartitions
+from operator import mul
 
 from funcstructs import compat
 
 from funcstructs.bases import Enumerable, typecheck
-from funcstructs.combinat import weak_compositions, divisors
+from funcstructs.bases.frozendict import _cached
+from funcstructs.combinat import (
+    weak_compositions, divisors, factorial_table, check_modulus
+)
+from funcstructs.combinat.partitions import (
+    fixed_length_partitions, multiplicity_partitions
+)
 from funcstructs.utils import split, subsequences
 
-from .functions import rangefunc, Endofunction
-from .multiset import Multiset
-from .necklaces import Necklace, FixedContentNecklaces
-from .rootedtrees import _levels_from_preim, DominantSequence, TreeEnumerator
+from .functions import rangefunc, Bijection, Endofunction
+from .multiset import Multiset, IntMultiset
+from .necklaces import Necklace, FixedContentNecklaces, smallest_rotation
+from .rootedtrees import (
+    _levels_from_preim, _counts_upto, DominantSequence, TreeEnumerator
+)
 
 
-__all__ = ("ConjugacyClass", "Funcstructs")
+__all__ = (
+    "ConjugacyClass", "are_conjugate", "conjugating_bijection",
+    "StructureIndex", "Funcstructs", "funcstruct_counts_upto"
+)
 
 
 class ConjugacyClass(Multiset):
@@ -79,6 +87,7 @@ class ConjugacyClass(Multiset):
                 return self
             raise TypeError("ConjugacyClass must have cycles of rooted trees")
 
+    @_cached
     def __len__(self):
         """Number of nodes in the structure."""
         node_count = 0
@@ -90,15 +99,17 @@ class ConjugacyClass(Multiset):
     # 1) Semantic similarity with Funcstructs.cycle_type
     # 2) In the VAST majority of cases, it is sublinear (< sqrt(n)) to compute.
     @property
+    @_cached
     def cycle_type(self):
         """Return the type of a structure's cycle decomposition."""
         # Equivalent to Multiset(map(len, self)), but more efficient
         # in the case of highly degeneracy cycles.
-        m = defaultdict(int)
+        counts = [0]*(max(map(len, self._keys()))+1 if self else 0)
         for cycle, mult in self._items():
-            m[len(cycle)] += mult
-        return Multiset(m)
+            counts[len(cycle)] += mult
+        return IntMultiset.fromcounts(counts)
 
+    @_cached
     def degeneracy(self):
         """The number of ways to label a graph representing a particular
         endofunction with the given structure."""
@@ -142,10 +153,226 @@ class ConjugacyClass(Multiset):
         return tuple(compat.accumulate(cardinalities))[1:]
 
 
-def _partitions(n):
-    """Wrapper for D Eppstein's partitions returning multisets"""
-    for partition in IntegerPartitions.partitions(n):
-        yield Multiset(partition)
+# Testing Conjugacy
+# =================
+# Two Endofunctions are conjugate if and only if their cycles, read as
+# necklaces of the rooted trees attached to each cyclic node, can be
+# matched up. Trees are compared by labelling each node with an integer
+# naming the shape of its tree of acyclic ancestors: leaves first, each
+# node's label is looked up from the sorted labels of its children in a
+# table shared by both functions (the AHU tree isomorphism algorithm).
+# Cycles are then compared by the smallest rotations of their sequences of
+# labels. This is linear up to sorting, but cheaper invariants are checked
+# first, since most pairs of functions differ in one: size, fiber sizes
+# and cycle type, then the number of nodes at each distance from the
+# cycles.
+
+
+def _invariants(f, cycles=None):
+    """Size, fiber sizes and cycle type of an Endofunction, whose cycles
+    may be given if already known."""
+    if cycles is None:
+        cycles = f.cycles()
+    fibers = defaultdict(int)
+    for y in f._values():
+        fibers[y] += 1
+    return (len(f), tuple(sorted(fibers.values())),
+            tuple(sorted(map(len, cycles))))
+
+
+def _ancestry(f, cycles):
+    """Return (children, levels) for an Endofunction f with the given
+    cycles, where children[x] lists the acyclic nodes which f maps to x,
+    and levels[d] lists the nodes at distance d from the cycles."""
+    cyclic = list(chain.from_iterable(cycles))
+    on_cycle = set(cyclic)
+    children = defaultdict(list)
+    for x, y in f:
+        if x not in on_cycle:
+            children[y].append(x)
+    levels = []
+    level = cyclic
+    while level:
+        levels.append(level)
+        level = [x for y in level for x in children[y]]
+    return children, levels
+
+
+def _canonical_cycles(cycles, children, levels, shapes):
+    """Return (canonical, labels) for an Endofunction with the given cycles
+    and ancestry.
+
+    labels[x] names the shape of the tree of acyclic ancestors of x in the
+    table shapes, which is extended as needed. canonical is a list of
+    (key, nodes) pairs where nodes is a cycle rotated to start from its
+    smallest sequence of labels, and key is that sequence."""
+    labels = {}
+    # Label the deepest nodes first, so children come before their parents.
+    for level in reversed(levels):
+        for x in level:
+            shape = tuple(sorted(labels[y] for y in children[x]))
+            labels[x] = shapes.setdefault(shape, len(shapes))
+    canonical = []
+    for cycle in cycles:
+        start, _ = smallest_rotation([labels[x] for x in cycle])
+        cycle = cycle[start:] + cycle[:start]
+        canonical.append((tuple(labels[x] for x in cycle), cycle))
+    return canonical, labels
+
+
+def _conjugacy_forms(f, g):
+    """Return (canonical, labels, children) for each of f and g, as from
+    _canonical_cycles and _ancestry with a shared table of shapes, or None
+    if f and g are not conjugate."""
+    if not isinstance(f, Endofunction) or not isinstance(g, Endofunction):
+        raise TypeError("Conjugacy is only defined for Endofunctions")
+    fcycles, gcycles = f.cycles(), g.cycles()
+    if _invariants(f, fcycles) != _invariants(g, gcycles):
+        return None
+    fchildren, flevels = _ancestry(f, fcycles)
+    gchildren, glevels = _ancestry(g, gcycles)
+    if list(map(len, flevels)) != list(map(len, glevels)):
+        return None
+    shapes = {}
+    fcanonical, flabels = _canonical_cycles(fcycles, fchildren, flevels,
+                                            shapes)
+    gcanonical, glabels = _canonical_cycles(gcycles, gchildren, glevels,
+                                            shapes)
+    if Multiset(key for key, _ in fcanonical) != \
+            Multiset(key for key, _ in gcanonical):
+        return None
+    return (fcanonical, flabels, fchildren), (gcanonical, glabels, gchildren)
+
+
+def are_conjugate(f, g):
+    """Return whether there exists a Bijection b with b.conj(f) == g.
+    Equivalent to, but much faster than,
+
+        ConjugacyClass(f) == ConjugacyClass(g)
+    """
+    return _conjugacy_forms(f, g) is not None
+
+
+def conjugating_bijection(f, g):
+    """Return a Bijection b with b.conj(f) == g, or None if f and g are
+    not conjugate."""
+    forms = _conjugacy_forms(f, g)
+    if forms is None:
+        return None
+    (fcycles, flabels, fchildren), (gcycles, glabels, gchildren) = forms
+    matches = defaultdict(list)
+    for key, cycle in gcycles:
+        matches[key].append(cycle)
+    # Match up cycles with the same key node by node, then the children of
+    # each matched pair of nodes in order of their labels.
+    pairs = []
+    for key, cycle in fcycles:
+        pairs.extend(zip(cycle, matches[key].pop()))
+    bijection = {}
+    while pairs:
+        x, y = pairs.pop()
+        bijection[x] = y
+        pairs.extend(zip(sorted(fchildren[x], key=flabels.__getitem__),
+                         sorted(gchildren[y], key=glabels.__getitem__)))
+    return Bijection(bijection)
+
+
+class StructureIndex(object):
+    """Counts of Endofunctions grouped by conjugacy class.
+
+    Computing ConjugacyClass(f) is slow compared with cheaper invariants,
+    which usually suffice to tell structures apart. Functions are therefore
+    filed under a cascade of invariants: first their size, fiber sizes and
+    cycle type, then their image path, and finally their ConjugacyClass.
+    Each level is only computed when a function with the same invariants at
+    the level above has already been added.
+
+    >>> index = StructureIndex()
+    >>> index.add(Endofunction({0: 0, 1: 0}))
+    >>> index.add(Endofunction({0: 1, 1: 1}), 2)
+    >>> index.count(Endofunction({'a': 'b', 'b': 'b'}))
+    3
+    >>> len(index)
+    1
+    """
+
+    _levels = (
+        _invariants,
+        lambda f: f.imagepath(),
+        ConjugacyClass
+    )
+
+    def __init__(self, funcs=()):
+        # Nodes are dicts from invariants at the next level to either a
+        # node or an entry [representative, count] for one class.
+        self._root = {}
+        self._len = 0
+        for f in funcs:
+            self.add(f)
+
+    def _find(self, f, add=0):
+        """Return the entry for the class of f, or None if there is none.
+        If add is nonzero, f is first added to the index add times."""
+        levels = iter(self._levels)
+        node = self._root
+        key = next(levels)(f)
+        entry = node.get(key)
+        while type(entry) is dict:
+            node = entry
+            key = next(levels)(f)
+            entry = node.get(key)
+        if entry is not None:
+            # f is in the class of the entry if the remaining invariants
+            # agree. When adding, file the entry under each one computed.
+            for invariant in levels:
+                rep_key = invariant(entry[0])
+                f_key = invariant(f)
+                if add:
+                    node[key] = node = {rep_key: entry}
+                    key = f_key
+                if rep_key != f_key:
+                    entry = None
+                    break
+        if add:
+            if entry is None:
+                entry = node[key] = [f, 0]
+                self._len += 1
+            entry[1] += add
+        return entry
+
+    def add(self, f, count=1):
+        """Add count copies of the Endofunction f to the index."""
+        if not isinstance(f, Endofunction):
+            raise TypeError("%r is not an Endofunction" % (f, ))
+        self._find(f, count)
+
+    def count(self, f):
+        """Number of Endofunctions in the index conjugate to f."""
+        entry = self._find(f)
+        return 0 if entry is None else entry[1]
+
+    def __contains__(self, f):
+        return isinstance(f, Endofunction) and self._find(f) is not None
+
+    def __len__(self):
+        """Number of distinct conjugacy classes in the index."""
+        return self._len
+
+    def items(self):
+        """Generate (f, count) for the first Endofunction f added from each
+        conjugacy class and the number of functions in that class."""
+        stack = [self._root]
+        while stack:
+            for entry in stack.pop().values():
+                if type(entry) is list:
+                    yield tuple(entry)
+                else:
+                    stack.append(entry)
+
+    def __iter__(self):
+        """Generate a representative Endofunction of each class."""
+        for f, _ in self.items():
+            yield f
 
 
 # The following algorithm for enumerating conjugacy classes of
@@ -218,9 +445,10 @@ def integer_funcstructs(n):
     """Enumerate endofunction structures on n elements. Equivalent to
     all conjugacy classes in TransformationMonoid(n)."""
     for i in range(1, n+1):
-        # TODO: partition micro-benchmarks using groupby vs Multiset.
-        for partition in _partitions(i):
-            for struct in cycle_type_funcstructs(n, partition):
+        # Partitions in multiplicity form are already split into cycle
+        # lengths and their multiplicities, so no Multiset is needed.
+        for lengths, mults in multiplicity_partitions(i):
+            for struct in _cycle_type_funcstructs(n-i, lengths, mults):
                 yield struct
 
 
@@ -254,10 +482,14 @@ def integer_funcstructs(n):
 def cycle_type_funcstructs(node_count, cycle_type):
     """Enumerate all conjugacy classes with the given node count and cycle
     type."""
-    n = node_count - sum(cycle_type)
-    k = cycle_type.num_unique_elements()
     lengths, mults = split(cycle_type)
-    for composition in weak_compositions(n, k):
+    return _cycle_type_funcstructs(node_count-sum(cycle_type), lengths, mults)
+
+
+def _cycle_type_funcstructs(n, lengths, mults):
+    """Enumerate conjugacy classes with n tree nodes whose cycle type has
+    mults[i] cycles of length lengths[i]."""
+    for composition in weak_compositions(n, len(lengths), shared=True):
         cycle_groups = []
         for c, l, m in zip(composition, lengths, mults):
             cycle_groups.append(component_groups(c, l, m))
@@ -286,7 +518,7 @@ def cycle_type_funcstructs(node_count, cycle_type):
 def direct_unordered_attachments(t, m):
     """Enumerate the ways of directly attaching t unlabelled free nodes to l
     unlabelled nodes."""
-    return IntegerPartitions.fixed_length_partitions(t+m, m)
+    return fixed_length_partitions(t+m, m)
 
 
 # Unordered Product
@@ -393,6 +625,92 @@ def attachment_forests(t, l):
                 yield necklace
 
 
+# Counting Endofunction Structures
+# ================================
+# An endofunction structure is a multiset of connected components, each a
+# cycle of rooted trees. If T(x) is the generating function of rooted
+# trees, the structures are counted by (OEIS A001372)
+#
+#   F(x) = prod(1/(1 - T(x**k)) for k >= 1)
+#
+# which is the Euler transform of the numbers of connected structures:
+#
+#   n*F[n] = sum(C[i]*F[n-i] for i in range(1, n+1))
+#
+# Taking logarithmic derivatives, C[n] is the sum of (n/j)*L[j] over the
+# divisors j of n, where L[j] = sum(i*T[i]*G[j-i] for i in range(1, j+1))
+# and G = 1/(1 - T) counts sequences of rooted trees. Every term depends
+# only on earlier ones, so the counts for all n up to N are found in
+# O(N**2) operations and kept in growable tables, one for each modulus.
+
+
+class _FuncstructCounts(object):
+    """Growable table of the numbers of endofunction structures, modulo mod
+    if given, which must then be a prime."""
+
+    def __init__(self, mod=None):
+        self.mod = mod
+        self.counts = [1]
+        self._sequences = [1]
+        self._weighted = [0]
+        self._logs = [0]
+        self._connected = [0]
+
+    def extend(self, n):
+        """Count the structures on up to n nodes."""
+        F = self.counts
+        if n < len(F):
+            return F
+        mod = self.mod
+        if mod is not None:
+            inverse = factorial_table(mod).inverse
+        T = _counts_upto(n, mod)
+        G = self._sequences
+        W = self._weighted
+        L = self._logs
+        C = self._connected
+        for m in range(len(F), n+1):
+            W.append(m*T[m])
+            # Convolutions of the new terms with the earlier ones.
+            g = sum(map(mul, T[1:m+1], reversed(G)))
+            l = sum(map(mul, W[1:m+1], reversed(G)))
+            c = sum(m//j*L[j] for j in divisors(m) if j < m) + l
+            if mod is not None:
+                g %= mod
+                l %= mod
+                c %= mod
+            G.append(g)
+            L.append(l)
+            C.append(c)
+            f = sum(map(mul, C[1:m+1], reversed(F)))
+            if mod is None:
+                F.append(f//m)
+            else:
+                F.append(f % mod * inverse(m) % mod)
+        return F
+
+
+_funcstruct_counts = {}
+
+
+def _funcstruct_counts_upto(n, mod=None):
+    """The shared table of structure counts modulo mod, extended up to n."""
+    if mod is not None:
+        check_modulus(mod, n)
+    try:
+        table = _funcstruct_counts[mod]
+    except KeyError:
+        table = _funcstruct_counts.setdefault(mod, _FuncstructCounts(mod))
+    return table.extend(n)
+
+
+def funcstruct_counts_upto(n, mod=None):
+    """List whose kth element is the number of endofunction structures on k
+    nodes, for k up to n, modulo mod if given, which must be a prime
+    greater than n."""
+    return _funcstruct_counts_upto(n, mod)[:n+1]
+
+
 class Funcstructs(Enumerable):
     """Enumerator of endofunction structures consisting of n nodes,
     optionally restricted to a given cycle type. The following invariant
@@ -426,18 +744,16 @@ class Funcstructs(Enumerable):
             return True
         return False
 
-    def cardinality(self):
-        """Count the number of endofunction structures on n nodes.
-
-        Based on De Bruijn, N.G., "Enumeration of Mapping Patterns",
-        Journal of Combinatorial Theory, Volume 12, 1972. See the papers
-        directory for the original reference."""
-        tot = 0
-        for part in _partitions(self.n):
-            p = 1
-            for i in range(1, self.n+1):
-                s = sum(j*part.get(j, 0) for j in divisors(i))
-                b = part.get(i, 0)
-                p *= s**b * Fraction(i, 1)**(-b)/factorial(b)
-            tot += p
-        return int(tot)
+    def cardinality(self, mod=None):
+        """Count the endofunction structures on n nodes, modulo mod if given,
+        which must be a prime greater than n. The counts for all n are
+        cached, so that later calls for at most n nodes are lookups.
+
+        Structures of a given cycle type are counted by enumerating them."""
+        if self.cycle_type is not None:
+            count = Enumerable.cardinality(self)
+            if mod is None:
+                return count
+            check_modulus(mod, self.n)
+            return count % mod
+        return _funcstruct_counts_upto(self.n, mod)[self.n]
@@ -24,39 +24,103 @@ image sizes set can be O(n) (and has a lovely closed form formula).
 Caleb Levy, 2013, 2014 and 2015.
 """
 
-from math import factorial
-
 import numpy as np
 
 from funcstructs import combinat
+from funcstructs.combinat import factorial
 
 from . import conjstructs, functions
 
 
-def iterdist_brute(n):
-    """Calculate iterdist by enumerating all endofunction image paths."""
+def _block_iterdist(funcs):
+    """Iterdist of the endofunctions on range(n) given by the rows of a 2-D
+    array, computed for all rows at once."""
+    rows, n = funcs.shape
+    dist = np.zeros((n, n-1), dtype=np.int64)
+    # Offsetting each row by n times its index turns the block into a
+    # single endofunction on range(rows*n), so that composition and
+    # marking images are both flat array lookups.
+    flat = (funcs + np.arange(0, rows*n, n)[:, np.newaxis]).ravel()
+    iterate = flat
+    marks = np.empty(rows*n, dtype=bool)
+    for it in range(n-1):
+        marks.fill(False)
+        marks[iterate] = True
+        cards = marks.reshape(rows, n).sum(axis=1)
+        dist[:, it] = np.bincount(cards-1, minlength=n)
+        iterate = flat[iterate]
+    return dist
+
+
+def _range_iterdist(args):
+    """Iterdist of the endofunctions at positions start to stop of
+    TransformationMonoid(n)."""
+    n, start, stop = args
+    dist = np.zeros((n, n-1), dtype=np.int64)
+    blocks = functions.TransformationMonoid(n).index_blocks(
+        callback=_block_iterdist, start=start, stop=stop)
+    for block_dist in blocks:
+        dist += block_dist
+    return dist
+
+
+def iterdist_brute(n, processes=1):
+    """Calculate iterdist by enumerating all endofunction image paths.
+
+    If processes is not 1, TransformationMonoid(n) is split into ranges of
+    functions which are counted in a pool of that many worker processes,
+    or one per CPU if processes is None."""
+    size = n**n
+    if processes == 1:
+        ranges = [(n, 0, size)]
+        partial_dists = map(_range_iterdist, ranges)
+    else:
+        from multiprocessing import Pool, cpu_count
+        # Several ranges per process keep the workers evenly loaded.
+        nranges = 4 * (processes or cpu_count())
+        ranges = [(n, size*i//nranges, size*(i+1)//nranges)
+                  for i in range(nranges)]
+        pool = Pool(processes)
+        partial_dists = pool.imap_unordered(_range_iterdist, ranges)
     dist = np.zeros((n, n-1), dtype=object)
-    for f in functions.TransformationMonoid(n):
-        for it, card in enumerate(f.imagepath()):
-            dist[card-1, it] += 1
+    try:
+        for partial_dist in partial_dists:
+            dist += partial_dist
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
     return dist
 
 
-def iterdist_funcstruct(n, cycle_type=None):
+def iterdist_funcstruct(n, cycle_type=None, mod=None):
     """Every labelling of a function structure shares the same image path, thus
     we may calculate iteration distributions by enumerating all endofunction
-    structure image paths and scaling them by their multiplicities."""
+    structure image paths and scaling them by their multiplicities. If mod is
+    given, which must be a prime greater than n, the counts are reduced
+    modulo mod."""
     # TODO: Finalize proof that len(Funcstructs(n)) is O(a^n),
     # investigate possibility that a<=4, and add writeup to the repository.
     if n == 1:
         c = 0 if(cycle_type or sum(cycle_type) != 1) else 1
         return np.array([c], dtype=object)
     dist = np.zeros((n, n-1), dtype=object)
-    nfac = factorial(n)
+    if mod is not None:
+        combinat.check_modulus(mod, n)
+        table = combinat.factorial_table(mod)
+        nfac = table.factorial(n)
+    else:
+        nfac = factorial(n)
     for struct in conjstructs.Funcstructs(n, cycle_type):
-        mult = nfac//struct.degeneracy()
+        if mod is None:
+            mult = nfac//struct.degeneracy()
+        else:
+            # The degeneracy divides n!, so it is prime to mod.
+            mult = nfac * table.inverse(struct.degeneracy()) % mod
         for it, card in enumerate(struct.imagepath()):
             dist[card-1, it] += mult
+    if mod is not None:
+        dist %= mod
     return dist
 
 iterdist = iterdist_funcstruct
@@ -82,20 +146,30 @@ def imagedist_composition(n):
     return tuple(dist)
 
 
-def imagedists_upto(n):
+def imagedists_upto(n, mod=None):
     """Left column of iterdist. This uses a recursion relation to run in O(n^2)
     time. It is the fastest method I know of and likely the fastest there is.
     The idea behind it is a modified special form of the monomial symmetric
-    polynomial algorithm."""
+    polynomial algorithm. If mod is given, the counts are reduced modulo
+    mod."""
     # TODO: place writeup in the notes.
     dist = np.zeros((n, n), dtype=object)
     for i in range(n):
         dist[0, i] = dist[i, i] = 1
         for j in range(i):
             dist[j, i] = dist[j-1, i-1] + (j+1)*dist[j, i-1]
+            if mod is not None:
+                dist[j, i] %= mod
     for i in range(n):
+        # Scale by the falling factorial (i+1)!/(i-j)!, built up over j.
+        falling = 1
         for j in range(i+1):
-            dist[j, i] *= factorial(i+1)//factorial(i-j)
+            falling *= i+1-j
+            if mod is not None:
+                falling %= mod
+            dist[j, i] *= falling
+    if mod is not None:
+        dist %= mod
     return dist
 
 imagedist_recurse = imagedist = lambda n: list(imagedists_upto(n)[:, -1])
@@ -104,11 +178,11 @@ imagedist_recurse = imagedist = lambda n: list(imagedists_upto(n)[:, -1])
 def nCk_grid(n):
     """nCk(i, j) == nCk_table[i, j] for 0 <= j <= i <= m. """
     binomial_coeffs = np.zeros((n+1, n+1), dtype=object)
-    for i in range(n+1):
-        for j in range(n+1):
-            if j > i:
-                continue
-            binomial_coeffs[i, j] = combinat.nCk(i, j)
+    binomial_coeffs[:, 0] = 1
+    # Pascal's rule fills each row from the previous one at once.
+    for i in range(1, n+1):
+        binomial_coeffs[i, 1:] = (binomial_coeffs[i-1, 1:] +
+                                  binomial_coeffs[i-1, :-1])
     return binomial_coeffs
 
 
@@ -140,7 +214,7 @@ def limitdist_composition(n):
     # Memoize these lookups; saves a lot of time.
     exponentials = powergrid(n)
     binomial_coefficients = nCk_grid(n)
-    for comp in combinat.compositions(n):
+    for comp in combinat.compositions(n, shared=True):
         count = 1
         for i in range(1, len(comp)):
             count *= exponentials[comp[i-1], comp[i]]
@@ -151,15 +225,21 @@ def limitdist_composition(n):
     return tuple(dist)
 
 
-def limitset_count(n, k):
+def limitset_count(n, k, mod=None):
     """Analytic expression for the number of endofunctions on n nodes whose
-    cycle decompositions contain k elements."""
-    return k*n**(n-k)*factorial(n-1)//factorial(n-k)
-
-
-def limitdist_direct(n):
-    """Exact formula for the right-hand column of iterdist(n)"""
-    return tuple(limitset_count(n, k) for k in range(1, n+1))
+    cycle decompositions contain k elements, modulo mod if given."""
+    if mod is None:
+        return k*n**(n-k)*factorial(n-1)//factorial(n-k)
+    falling = 1
+    for j in range(n-k+1, n):
+        falling = falling * j % mod
+    return k * pow(n, n-k, mod) * falling % mod
+
+
+def limitdist_direct(n, mod=None):
+    """Exact formula for the right-hand column of iterdist(n), modulo mod if
+    given."""
+    return tuple(limitset_count(n, k, mod) for k in range(1, n+1))
 
 
 def limitdist_recurse(n):
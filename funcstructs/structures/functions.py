@@ -7,12 +7,13 @@ import itertools
 import random
 from collections import defaultdict
 from functools import partial
-from math import factorial
 from platform import python_implementation
 
+from funcstructs.combinat import factorial
 from funcstructs.compat import is_index
 from funcstructs.bases import frozendict, Enumerable, typecheck
-from funcstructs.bases.frozendict import _map_accessors
+from funcstructs.bases.frozendict import _map_accessors, _cached
+from funcstructs.bases.hamt import PersistentMapping
 
 
 def _parsed_domain(domain):
@@ -32,6 +33,66 @@ def identity(domain=None):
     return Permutation(zip(S, S))
 
 
+class _FunctionTrie(PersistentMapping):
+    """PersistentMapping which also counts the images of its values, so
+    that the Function type of each derived mapping is known in O(log n)."""
+
+    __slots__ = '_images', '_distinct', '_outside'
+
+    def __init__(self, mapping):
+        PersistentMapping.__init__(self, mapping)
+        counts = defaultdict(int)
+        for y in mapping.values():
+            counts[y] += 1
+        # _images maps values to how many keys they are the image of
+        # (possibly zero), _distinct is the size of the image, and
+        # _outside the number of image points not in the domain.
+        self._images = PersistentMapping(counts)
+        self._distinct = len(counts)
+        self._outside = sum(1 for y in counts if y not in mapping)
+
+    def set(self, x, y):
+        old = self.get(x, _missing)
+        if old is _missing:
+            images = self._images
+            distinct = self._distinct
+            outside = self._outside - (images.get(x, 0) > 0)
+        elif old is y or old == y:
+            return self
+        else:
+            count = self._images[old] - 1
+            images = self._images.set(old, count)
+            distinct = self._distinct - (not count)
+            outside = self._outside - (not count and old not in self)
+        count = images.get(y, 0)
+        images = images.set(y, count + 1)
+        if not count:
+            distinct += 1
+            outside += y != x and y not in self
+        new = PersistentMapping.set(self, x, y)
+        new._images = images
+        new._distinct = distinct
+        new._outside = outside
+        return new
+
+    def __reduce__(self):
+        return (PersistentMapping, (self.copy(), ))
+
+
+_missing = object()
+
+
+def _functype(invertible, endomorphic):
+    """The most derived Function type with the given properties."""
+    if invertible and endomorphic:
+        return Permutation
+    elif invertible:
+        return Bijection
+    elif endomorphic:
+        return Endofunction
+    return Function
+
+
 def _FunctionHelper(fcls):
     """Helper for making the Functional mapping type."""
 
@@ -44,14 +105,7 @@ def _FunctionHelper(fcls):
         im = frozenset(mapping.values())
         invertible = len(im) == len(mapping)
         endomorphic = im.issubset(mapping.keys())
-        if invertible and endomorphic:
-            functype = Permutation
-        elif invertible:
-            functype = Bijection
-        elif endomorphic:
-            functype = Endofunction
-        else:
-            functype = Function
+        functype = _functype(invertible, endomorphic)
         # Function, Bijection, Endofunction and Permutation should
         # collectively be thought of as "Function". Inputs are promoted
         # to the most derived type automatically, since ultimately,
@@ -107,6 +161,47 @@ def _FunctionHelper(fcls):
         return self
     fcls.__new__ = __new__
 
+    def update(self, pairs):
+        """Return a copy of f with f[x] = y for each (x, y) in pairs, which
+        may be a mapping or an iterable of pairs, promoted to the most
+        derived Function type.
+
+        The result is stored as a persistent hash trie sharing structure
+        with f, so that after the first update (which takes O(n) time to
+        build the trie) each pair costs O(log n) time and memory. Lookups
+        in such Functions are somewhat slower than in dict backed ones."""
+        mapping = map_get(self)
+        if not isinstance(mapping, _FunctionTrie):
+            mapping = _FunctionTrie(mapping)
+        mapping = mapping.update(pairs)
+        functype = _functype(mapping._distinct == len(mapping),
+                             not mapping._outside)
+        f = object.__new__(functype)
+        map_set(f, mapping)
+        return f
+    fcls.update = update
+
+    def set(self, x, y):
+        """f.set(x, y) <==> f.update([(x, y)])"""
+        return update(self, [(x, y)])
+    fcls.set = set
+
+    def image(self, subset=None):
+        """f.image() <==> {y for (x, y) if f}"""
+        if subset is None:
+            return frozenset(self._values())
+        else:
+            return frozenset(map(map_get(self).__getitem__, subset))
+    fcls.image = image
+
+    # Define composition of Functions
+
+    def __mul__(self, other):
+        """(f * g)[x] <==> f[g[x]]"""
+        f = map_get(self)
+        return fcls((x, f[y]) for x, y in other)
+    fcls.__mul__ = __mul__
+
     global _FunctionHelper
     del _FunctionHelper
 
@@ -157,6 +252,9 @@ class Function(frozendict):
         # and http://bugs.jython.org/issue1996.
         __slots__ += '__dict__',
 
+    # Functions are immutable, so their hashes only need computing once.
+    __hash__ = _cached(frozendict.__dict__['__hash__'])
+
     # In mathematics, the domain is an inherent property of a function.
 
     @property
@@ -166,14 +264,8 @@ class Function(frozendict):
 
     # Images, on the other hand, must be computed by evaluating f either
     # on the whole domain or the given subset, thus Function.image() is a
-    # method.
-
-    def image(self, subset=None):
-        """f.image() <==> {y for (x, y) if f}"""
-        if subset is None:
-            return frozenset(self._values())
-        else:
-            return frozenset(self[x] for x in subset)
+    # method. It is defined in _FunctionHelper, along with composition, so
+    # that they evaluate f by subscripting its mapping directly.
 
     # Mathematical functions describe a set of pairings of points; returning
     # elements of the domain does not provide useful information; only the
@@ -187,12 +279,6 @@ class Function(frozendict):
         """(x, y) in f <==> f[x] == y"""
         return item in self._items()
 
-    # Define composition of Functions
-
-    def __mul__(self, other):
-        """(f * g)[x] <==> f[g[x]]"""
-        return Function((x, self[y]) for x, y in other)
-
     # Design Note: Function objects used to be callable; their __call__ method
     # was set to dict.__getitem__ and __getitem__ itself was disabled.
     #
@@ -230,24 +316,10 @@ class Function(frozendict):
         return frozendict((y, frozenset(preim[y])) for y in self.image())
 
 
-class Bijection(Function):
-    """An invertible Function.
+def _BijectionHelper(bcls):
+    """Helper for making the Bijection mapping type."""
 
-    Bijection objects have an inverse method. For every Bijection b,
-    - b.inverse * b == identity(b.domain)
-    - b * b.inverse == identity(b.image)
-
-    They can also conjugate functions:
-    - b.conj(f) == b * f * b.inverse()
-    """
-    # TODO: add examples of the above
-
-    __slots__ = ()
-
-    @property
-    def inverse(self):
-        """s.inverse * s <==> identity(s.domain)"""
-        return self.__class__((y, x) for x, y in self)
+    _, map_get = _map_accessors()
 
     def conj(self, f):
         """s.conj(f) <==> s * f * s.inverse"""
@@ -262,52 +334,54 @@ class Bijection(Function):
         # If f(1) = f(2) = f(3) = 3, and g(a) = g(b) = g(c) = c, then f is
         # related to g:  g(x) = s(f(s^-1(x))). We view conjugation *of* f as a
         # way to get *to* g.
-        return f.__class__((y, self[f[x]]) for x, y in self)
+        s = map_get(self)
+        return f.__class__((y, s[f[x]]) for x, y in self)
+    bcls.conj = conj
 
+    global _BijectionHelper
+    del _BijectionHelper
 
-class Endofunction(Function):
-    """A Function whose domain contains its codomain.
+    return bcls
 
-    Endofunctions support iteration using exponential notation.
 
-    >>> f = Endofunction({0: 0, 1: 0, 2: 1, 3: 2})
-    >>> f**2
-    Endofunction({0: 0, 1: 0, 2: 0, 3: 1})
-    >>> f**3
-    Endofunction({0: 0, 1: 0, 2: 0, 3: 0})
-    >>> f**0
-    >>> Permutation({0: 0, 1: 1, 2: 2, 3: 3})  # identity iterate
+@_BijectionHelper
+class Bijection(Function):
+    """An invertible Function.
 
-    Iteration can be used to form cycles.
+    Bijection objects have an inverse method. For every Bijection b,
+    - b.inverse * b == identity(b.domain)
+    - b * b.inverse == identity(b.image)
 
-    >>> f.cycles
-    frozenset([(0,)])
+    They can also conjugate functions:
+    - b.conj(f) == b * f * b.inverse()
     """
+    # TODO: add examples of the above
 
     __slots__ = ()
 
-    def __pow__(self, n):
-        """f**n <==> the nth iterate of f (n > 0)"""
-        f = self
-        f_iter = Permutation(zip(self.domain, self.domain))
-        # Decompose f**n into the composition of power-of-2 iterates, akin to
-        # exponentiation by squaring.
-        for it in bin(n)[-1:1:-1]:
-            if it == '1':
-                f_iter *= f
-            f *= f
-        return f_iter
+    @property
+    def inverse(self):
+        """s.inverse * s <==> identity(s.domain)"""
+        return self.__class__((y, x) for x, y in self)
+
+
+def _EndofunctionHelper(ecls):
+    """Helper for making the Endofunction mapping type."""
+
+    _, map_get = _map_accessors()
 
     # TODO: eliminate this method, or use it only for testing
     # ConjugacyClass.imagepath
     def imagepath(self):
         """f.imagepath()[n] <==> len((f**n).image)"""
-        cardinalities = [len(self.image())]
-        f = self
-        card_prev = len(self)
+        # The image of f**(n+1) is the image of the image of f**n under f.
+        image = self.image()
+        cardinalities = [len(image)]
+        f = map_get(self)
+        card_prev = len(image)
         for it in range(1, len(self)-1):
-            f *= self
-            card = len(f.image())
+            image = set(map(f.__getitem__, image))
+            card = len(image)
             cardinalities.append(card)
             # Save some time; if we have reached the fixed set, return.
             if card == card_prev:
@@ -315,10 +389,12 @@ class Endofunction(Function):
                 break
             card_prev = card
         return tuple(cardinalities)
+    ecls.imagepath = imagepath
 
     def cycles(self):
         """Return the set of f's cycles"""
         # Algorithm runs in O(len(self))
+        f = map_get(self)
         tried = set()
         remaining = set(self.domain)
         cycles = []
@@ -330,7 +406,7 @@ class Endofunction(Function):
             while x not in tried:
                 remaining.discard(x)
                 tried.add(x)
-                x = self[x]
+                x = f[x]
                 if x not in index:
                     path.append(x)
                     i += 1
@@ -339,6 +415,47 @@ class Endofunction(Function):
                     cycles.append(path[index[x]:])
                     break
         return frozenset(map(tuple, cycles))
+    ecls.cycles = cycles
+
+    global _EndofunctionHelper
+    del _EndofunctionHelper
+
+    return ecls
+
+
+@_EndofunctionHelper
+class Endofunction(Function):
+    """A Function whose domain contains its codomain.
+
+    Endofunctions support iteration using exponential notation.
+
+    >>> f = Endofunction({0: 0, 1: 0, 2: 1, 3: 2})
+    >>> f**2
+    Endofunction({0: 0, 1: 0, 2: 0, 3: 1})
+    >>> f**3
+    Endofunction({0: 0, 1: 0, 2: 0, 3: 0})
+    >>> f**0
+    >>> Permutation({0: 0, 1: 1, 2: 2, 3: 3})  # identity iterate
+
+    Iteration can be used to form cycles.
+
+    >>> f.cycles
+    frozenset([(0,)])
+    """
+
+    __slots__ = ()
+
+    def __pow__(self, n):
+        """f**n <==> the nth iterate of f (n > 0)"""
+        f = self
+        f_iter = Permutation(zip(self.domain, self.domain))
+        # Decompose f**n into the composition of power-of-2 iterates, akin to
+        # exponentiation by squaring.
+        for it in bin(n)[-1:1:-1]:
+            if it == '1':
+                f_iter *= f
+            f *= f
+        return f_iter
 
     @property
     def limitset(self):
@@ -412,6 +529,56 @@ def randconj(f, newdomain=None):
     return randperm(f.domain, newdomain).conj(f)
 
 
+# Batches of random functions are represented as in Mappings.index_blocks:
+# each row holds the codomain indices of the images of the domain, with
+# both ordered as they are enumerated by Mappings. Random numbers come from
+# a numpy Generator made from seed by numpy.random.default_rng, so an int
+# or SeedSequence seed reproduces a batch. For parallel runs, give each
+# worker one of numpy.random.SeedSequence(seed).spawn(workers) to get
+# reproducible, independent streams. Generators need numpy 1.17 or later;
+# older versions fall back to numpy.random.RandomState, which takes only
+# int seeds and gives different batches for the same seed.
+
+
+def randfunc_array(count, domain, codomain=None, invertible=False,
+                   seed=None):
+    """Return a 2-D numpy array whose count rows are random Functions from
+    domain to codomain. Requires numpy."""
+    import numpy as np
+    mappings = Mappings(domain, codomain, invertible)
+    if not len(mappings):
+        raise ValueError("No Functions from %s to %s" % (
+                         mappings.domain, mappings.codomain))
+    shape = (count, len(mappings.domain))
+    if hasattr(np.random, "default_rng"):
+        rng = np.random.default_rng(seed)
+        integers, uniform = rng.integers, rng.random
+    else:
+        rng = np.random.RandomState(seed)
+        integers, uniform = rng.randint, rng.random_sample
+    if not invertible:
+        return integers(len(mappings.codomain), size=shape, dtype=np.intp)
+    # Sorting uniform random keys gives uniformly random permutations.
+    return uniform(shape).argsort(axis=1)
+
+
+randperm_array = partial(randfunc_array, invertible=True)
+
+
+def randconj_array(f, count, seed=None):
+    """Return a 2-D numpy array whose count rows are random conjugates of
+    the Endofunction f, as indices into its domain. Requires numpy."""
+    import numpy as np
+    domain, _ = Mappings(f.domain)._ordered()
+    index = dict(zip(domain, range(len(domain))))
+    images = np.array([index[f[x]] for x in domain], dtype=np.intp)
+    perms = randperm_array(count, len(domain), seed=seed)
+    # The conjugate p*f*p**-1 maps p[x] to p[f[x]].
+    conjugates = np.empty_like(perms)
+    conjugates[np.arange(count)[:, np.newaxis], perms] = perms[:, images]
+    return conjugates
+
+
 # Function enumerators
 
 
@@ -441,11 +608,16 @@ class Mappings(Enumerable):
         self.codomain = codomain
         self.invertible = invertible
 
-    def __iter__(self):
+    def _ordered(self):
+        """Domain and codomain as tuples, in the order used to enumerate
+        self: sorted, if possible."""
         try:
-            domain, codomain = map(sorted, [self.domain, self.codomain])
+            return tuple(sorted(self.domain)), tuple(sorted(self.codomain))
         except TypeError:
-            domain, codomain = map(tuple, [self.domain, self.codomain])
+            return tuple(self.domain), tuple(self.codomain)
+
+    def __iter__(self):
+        domain, codomain = self._ordered()
         if not self.invertible:
             for f in itertools.product(codomain, repeat=len(domain)):
                 yield Function(zip(domain, f))
@@ -453,6 +625,112 @@ class Mappings(Enumerable):
             for f in itertools.permutations(codomain):
                 yield Bijection(zip(domain, f))
 
+    def _indices(self, k):
+        """Codomain indices of the images of the domain in the kth
+        function of self, for 0 <= k < len(self)."""
+        n = len(self.domain)
+        if not self.invertible:
+            # Mixed-radix digits of k, most significant first.
+            base = len(self.codomain)
+            indices = [0]*n
+            for i in reversed(range(n)):
+                k, indices[i] = divmod(k, base)
+        else:
+            # Decode k as a Lehmer code: the digits of k in the factorial
+            # number system choose from the indices not yet used.
+            remaining = list(range(n))
+            indices = []
+            for i in reversed(range(n)):
+                j, k = divmod(k, factorial(i))
+                indices.append(remaining.pop(j))
+        return indices
+
+    def _function(self, domain, codomain, indices):
+        functype = Bijection if self.invertible else Function
+        return functype(zip(domain, map(codomain.__getitem__, indices)))
+
+    def _iter_range(self, start, stop):
+        """Generate the Functions of self at positions start to stop."""
+        if start >= stop:
+            return
+        domain, codomain = self._ordered()
+        indices = self._indices(start)
+        last = len(codomain) - 1
+        for _ in range(stop - start - 1):
+            yield self._function(domain, codomain, indices)
+            if not self.invertible:
+                i = len(indices) - 1
+                while indices[i] == last:
+                    indices[i] = 0
+                    i -= 1
+                indices[i] += 1
+            else:
+                # Step to the next permutation in lexicographic order.
+                i = len(indices) - 2
+                while indices[i] > indices[i+1]:
+                    i -= 1
+                j = len(indices) - 1
+                while indices[j] < indices[i]:
+                    j -= 1
+                indices[i], indices[j] = indices[j], indices[i]
+                indices[i+1:] = reversed(indices[i+1:])
+        yield self._function(domain, codomain, indices)
+
+    def unrank(self, k):
+        """Return the Function at position k in the enumeration of self,
+        computed without enumerating self."""
+        if not 0 <= k < self.cardinality():
+            raise IndexError("Mappings index out of range")
+        domain, codomain = self._ordered()
+        return self._function(domain, codomain, self._indices(k))
+
+    def index_blocks(self, size=4096, callback=None, start=0, stop=None):
+        """Generate the Functions of self in blocks of at most size rows, as
+        2-D numpy arrays of codomain indices, in the same order as iteration.
+
+        Entry [r, i] of a block is the index in the codomain of the image of
+        the ith element of the domain, where both are ordered as in
+        iteration, so the blocks of TransformationMonoid(n) and
+        SymmetricGroup(n) hold the functions on range(n) themselves. Only
+        the Functions at positions start to stop are included. Blocks are
+        views of a single array, updated in place. If callback is given,
+        callback(block) is yielded instead of each block, for reducing
+        blocks as they are made. Requires numpy."""
+        import numpy as np
+        n = len(self.domain)
+        count = self.cardinality()
+        stop = count if stop is None else min(stop, count)
+        if start >= stop:
+            return
+        # Each block fixes the images of the first n-k domain elements and
+        # holds every choice of the last k, which are the same for every
+        # block, so only a prefix changes between blocks.
+        k = 0
+        if self.invertible:
+            while k < n and factorial(k+1) <= size:
+                k += 1
+            tail = np.array(list(itertools.permutations(range(k))),
+                            dtype=np.intp).reshape(factorial(k), k)
+        else:
+            base = len(self.codomain)
+            while k < n and base**(k+1) <= size:
+                k += 1
+            tail = np.indices((base, )*k).reshape(k, base**k).T
+        rows = len(tail)
+        block = np.empty((rows, n), dtype=np.intp)
+        block[:, n-k:] = tail
+        for b in range(start//rows, (stop-1)//rows + 1):
+            indices = self._indices(b*rows)
+            block[:, :n-k] = indices[:n-k]
+            if self.invertible:
+                # Permutations of the unused indices, in increasing order.
+                rest = np.array(sorted(indices[n-k:]), dtype=np.intp)
+                block[:, n-k:] = rest[tail]
+            lo = max(start - b*rows, 0)
+            hi = min(stop - b*rows, rows)
+            funcs = block[lo:hi]
+            yield funcs if callback is None else callback(funcs)
+
     @typecheck(Function)
     def __contains__(self, other):
         # Cannot use self.domain == other.domain since Jython cannot
@@ -464,12 +742,15 @@ class Mappings(Enumerable):
                 return self.codomain.issuperset(other.image())
         return False
 
-    def __len__(self):
+    def cardinality(self):
         if self.invertible:
             return factorial(len(self.domain))
         else:
             return len(self.codomain) ** len(self.domain)
 
+    def __len__(self):
+        return self.cardinality()
+
 
 Isomorphisms = partial(Mappings, invertible=True)
 TransformationMonoid = partial(Mappings, codomain=None, invertible=False)
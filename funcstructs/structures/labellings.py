@@ -3,41 +3,89 @@
 Caleb Levy, 2015.
 """
 
-from itertools import chain, combinations, permutations, product
-from math import factorial
+import random
+from itertools import chain, permutations, product
 
+from funcstructs.combinat import factorial
 
-from funcstructs.utils import split
-
+from .functions import Permutation
 from .multiset import Multiset
 from .necklaces import Necklace
 
 
 __all__ = [
     "equipartitions", "equipartition_count", "ordered_divisions",
-    "set_partitions", "set_partition_count", "cycle_labellings",
-    "cycle_index",
+    "set_partitions", "set_partition_count", "rank_set_partition",
+    "unrank_set_partition", "random_set_partition", "cycle_labellings",
+    "cycle_index", "rank_cycle_labelling", "unrank_cycle_labelling",
+    "random_cycle_labelling", "cycle_type_permutations"
 ]
 
 
-def _equipartitions(S, b):
-    n = len(S)
-    if b == 1 or n == 1:
-        yield [tuple(S)]
-    else:
-        marked_el = (S.pop(), )
-        for first in combinations(S, n//b-1):
-            for remaining in _equipartitions(S.difference(first), b-1):
-                yield [marked_el + first] + remaining
+# Each of the generators below assigns the elements of a sequence S to
+# bins of fixed sizes. Bins of the same size are interchangeable when
+# dividing a set into unordered bins, so only the assignments where they
+# appear in order of their least elements are generated (when all the bins
+# have the same size, these are the restricted growth strings). Rather than
+# recursing on what remains of S, each element is placed in turn by a
+# non-recursive backtracking search which updates the bins in place. The
+# search never reaches a dead end, since the lowest bin with room left can
+# always accept the next element, so each step moves O(1) elements
+# amortized.
+
+
+def _fill_bins(S, sizes, first):
+    """Generate the ways of placing S[i] in bin w[i] for each i such that
+    bin j holds sizes[j] elements, and such that if j > first[j], an element
+    is placed in bin j only after one is placed in bin j-1. The same list of
+    bins is yielded each time, updated in place."""
+    bins = [[] for _ in sizes]
+    if not S:
+        yield bins
+        return
+    word = [0]*len(S)
+    i = j = 0
+    while True:
+        while j < len(bins):
+            b = bins[j]
+            if len(b) < sizes[j] and (b or first[j] == j or bins[j-1]):
+                break
+            j += 1
+        if j < len(bins):
+            bins[j].append(S[i])
+            word[i] = j
+            i += 1
+            j = 0
+            if i < len(S):
+                continue
+            yield bins
+        i -= 1
+        if i < 0:
+            return
+        j = word[i]
+        bins[j].pop()
+        j += 1
+
+
+def _elements(S):
+    """Convert S to a list. If S is int, use range(S)."""
+    if isinstance(S, int):
+        S = range(S)
+    return list(S)
 
 
-def equipartitions(S, b):
-    """Partitions of S into b of equally sized unordered bins."""
-    S = set(S)
+def equipartitions(S, b, shared=False):
+    """Partitions of S into b of equally sized unordered bins.
+
+    If shared is True, the bins are instead yielded as a single list of
+    lists, ordered by their least elements and updated in place."""
+    S = _elements(S)
     if len(S) % b:
         raise ValueError("items must divide evenly")
-    for division in _equipartitions(S, b):
-        yield frozenset(map(frozenset, division))
+    divisions = _fill_bins(S, [len(S)//b]*b, [0]*b)
+    if shared:
+        return divisions
+    return (frozenset(map(frozenset, bins)) for bins in divisions)
 
 
 def equipartition_count(n, b):
@@ -57,50 +105,60 @@ def equipartition_count(n, b):
 
 
 def _ordered_divisions(S, part):
-    if len(part) == 1:
-        yield [tuple(S)]
-    else:
-        for first in combinations(S, part[0]):
-            for remaining in _ordered_divisions(S.difference(first), part[1:]):
-                yield [first] + remaining
+    return _fill_bins(S, part, range(len(part)))
 
 
-def ordered_divisions(partition, S=None):
+def ordered_divisions(partition, S=None, shared=False):
     """Enumerate ordered partitions of a set; i.e. order of the elements in
     each bin does not matter, but if the same bin is found in two different
     locations, it is a different ordered partition. Bin sizes are fixed and
-    ordered according to partition."""
+    ordered according to partition.
+
+    If shared is True, the bins are instead yielded as a single list of
+    lists, updated in place."""
     partition = list(partition)
     if S is None:
         S = sum(partition)
-    if isinstance(S, int):
-        S = range(S)
+    S = _elements(S)
     if not len(S) == sum(partition):
         raise ValueError("partition must sum to size of set")
-    for p in _ordered_divisions(set(S), partition):
-        yield tuple(map(frozenset, p))
-
-
-def _set_partitions(S, partition):
-    lengths, mults = split(Multiset(partition), sort=True)
-    # clm[i] is the number of nodes situated in some bin of size l[i].
-    for odiv in _ordered_divisions(S, [l*m for l, m in zip(lengths, mults)]):
-        strand = []
-        for m, c in zip(mults, odiv):
-            strand.append(_equipartitions(set(c), m))
-        for bundle in product(*strand):
-            yield chain(*bundle)
+    divisions = _ordered_divisions(S, partition)
+    if shared:
+        return divisions
+    return (tuple(map(frozenset, bins)) for bins in divisions)
 
 
-def set_partitions(partition, S=None):
-    """Unordered allocations of a set amongst a partition of bin sizes."""
+def _bin_shapes(partition, S):
+    """Return (S, sizes, first) for dividing S into unordered bins with
+    sizes given by partition, as used by _fill_bins, or None if there are
+    not enough elements. Any elements of S left over go in an extra bin."""
     if S is None:
         S = sum(partition)
-    if isinstance(S, int):
-        S = range(S)
-    for subset in combinations(S, sum(partition)):
-        for p in _set_partitions(set(subset), partition):
-            yield frozenset(map(frozenset, p))
+    S = _elements(S)
+    sizes = sorted(partition)
+    first = [sizes.index(size) for size in sizes]
+    if len(S) > sum(sizes):
+        first.append(len(sizes))
+        sizes.append(len(S) - sum(sizes))
+    elif len(S) < sum(sizes):
+        return None
+    return S, sizes, first
+
+
+def set_partitions(partition, S=None, shared=False):
+    """Unordered allocations of a set amongst a partition of bin sizes.
+
+    If shared is True, the bins are instead yielded as a single list of
+    lists, ordered by size then least element, and updated in place. Any
+    elements of S left out of the partition are in an extra final bin."""
+    shapes = _bin_shapes(partition, S)
+    if shapes is None:
+        return iter(())
+    divisions = _fill_bins(*shapes)
+    if shared:
+        return divisions
+    count = len(partition)
+    return (frozenset(map(frozenset, bins[:count])) for bins in divisions)
 
 
 def set_partition_count(partition, n=None):
@@ -116,22 +174,128 @@ def set_partition_count(partition, n=None):
 
     Alternatively it is the cycle index divided by the factorial of one less
     than each cycle length, including multiplicity, since here permutation
-    order does not matter. """
-    partition = Multiset(partition)
+    order does not matter. If n exceeds the sum of the partition, the
+    elements left over are treated as one more bin."""
+    if not isinstance(partition, Multiset):
+        partition = Multiset(partition)
+    total = sum(partition)
     if n is None:
-        n = sum(partition)
-    count = factorial(n)
+        n = total
+    if n < total:
+        return 0
+    count = factorial(n) // factorial(n - total)
     for l, m in partition._items():
         count //= factorial(l)**m * factorial(m)
     return count
 
 
+# Ranking
+# =======
+# The divisions generated by _fill_bins are in lexicographic order of the
+# words w such that S[i] is in bin w[i]. Once the first i letters of a word
+# are fixed, the rest of the word may be any arrangement of the remaining
+# room in each bin, except that the empty bins in each class of equally
+# sized bins are interchangeable. The number of such completions, and
+# hence the number of divisions preceding a given one, follows from the
+# multinomial coefficient.
+
+
+def _completions(room, sizes, first):
+    """Number of ways of filling the bins with the given room left."""
+    count = factorial(sum(room))
+    empty = {}
+    for j, r in enumerate(room):
+        count //= factorial(r)
+        if r and r == sizes[j]:
+            empty[first[j]] = empty.get(first[j], 0) + 1
+    for m in empty.values():
+        count //= factorial(m)
+    return count
+
+
+def _open_bins(room, sizes, first):
+    """Bins which may receive the next element."""
+    for j, r in enumerate(room):
+        if r and (r < sizes[j] or first[j] == j or
+                  room[j-1] < sizes[j-1]):
+            yield j
+
+
+def _division_word(division, S, sizes):
+    """The word w such that S[i] is in bin w[i] of division, with bins
+    ordered as by _fill_bins."""
+    index = dict(zip(S, range(len(S))))
+    try:
+        bins = sorted((sorted(map(index.__getitem__, b)) for b in division),
+                      key=lambda b: (len(b), b))
+    except KeyError:
+        bins = None
+    if bins is not None:
+        word = [len(bins)]*len(S)
+        for j, b in enumerate(bins):
+            for i in b:
+                word[i] = j
+        counts = [word.count(j) for j in range(len(sizes))]
+        if counts == sizes:
+            return word
+    raise ValueError("%r is not a division of %r into bins of sizes %r" % (
+                     division, S, sizes))
+
+
+def rank_set_partition(division, partition, S=None):
+    """Return the position of division in set_partitions(partition, S)."""
+    shapes = _bin_shapes(partition, S)
+    if shapes is None:
+        raise ValueError("%r is not in set_partitions(%r, %r)" % (
+                         division, partition, S))
+    S, sizes, first = shapes
+    room = list(sizes)
+    rank = 0
+    for j in _division_word(division, S, sizes):
+        for k in _open_bins(room, sizes, first):
+            if k == j:
+                break
+            room[k] -= 1
+            rank += _completions(room, sizes, first)
+            room[k] += 1
+        room[j] -= 1
+    return rank
+
+
+def unrank_set_partition(partition, rank, S=None):
+    """Return the division at position rank in set_partitions(partition,
+    S)."""
+    shapes = _bin_shapes(partition, S)
+    if shapes is None or not 0 <= rank < set_partition_count(
+            partition, len(shapes[0])):
+        raise IndexError("set partition index out of range")
+    S, sizes, first = shapes
+    room = list(sizes)
+    bins = [[] for _ in sizes]
+    for x in S:
+        for j in _open_bins(room, sizes, first):
+            room[j] -= 1
+            count = _completions(room, sizes, first)
+            if rank < count:
+                break
+            rank -= count
+            room[j] += 1
+        bins[j].append(x)
+    return frozenset(map(frozenset, bins[:len(partition)]))
+
+
+def random_set_partition(partition, S=None):
+    """Return a uniformly random element of set_partitions(partition, S)."""
+    n = None if S is None else len(_elements(S))
+    count = set_partition_count(partition, n)
+    return unrank_set_partition(partition, random.randrange(count), S)
+
+
 def _cycle_permutations(cycle):
     """Given a set of elements, a representative of each cyclic permutation of
-    those elements."""
-    cycle = set(cycle)
-    start = min(cycle)
-    cycle.remove(start)
+    those elements, in lexicographic order."""
+    cycle = sorted(cycle)
+    start = cycle.pop(0)
     for p in permutations(cycle):
         # The cycles are necklaces: they start with the minimal element, and
         # all elements are unique, hence they are lexicographically minimal.
@@ -140,18 +304,168 @@ def _cycle_permutations(cycle):
 
 def cycle_labellings(partition, S=None):
     """Enumerate cycles with cycle type partition and labels from S"""
-    for upd in set_partitions(partition, S):
-        for cycle_group in product(*map(_cycle_permutations, upd)):
+    count = len(partition)
+    for bins in set_partitions(partition, S, shared=True):
+        cycle_groups = product(*map(_cycle_permutations, bins[:count]))
+        for cycle_group in cycle_groups:
             yield frozenset(cycle_group)
 
 
 def cycle_index(partition, n=None):
     """Found by multiplying the set partition count by the product of the
     number of permutations of each cycle."""
-    partition = Multiset(partition)
+    if not isinstance(partition, Multiset):
+        partition = Multiset(partition)
+    total = sum(partition)
     if n is None:
-        n = sum(partition)
-    count = factorial(n)
+        n = total
+    if n < total:
+        return 0
+    count = factorial(n) // factorial(n - total)
     for l, m in partition._items():
         count //= l**m * factorial(m)
     return count
+
+
+def rank_cycle_labelling(cycles, partition, S=None):
+    """Return the position of cycles in cycle_labellings(partition, S)."""
+    S = _elements(sum(partition) if S is None else S)
+    cycles = list(map(Necklace, cycles))
+    rank = rank_set_partition(map(frozenset, cycles), partition, S)
+    index = dict(zip(S, range(len(S))))
+    # Each cycle ranks as the permutation of its elements after its least,
+    # in the order its bin has in the set partition.
+    for cycle in sorted(cycles, key=lambda c: (
+            len(c), min(map(index.__getitem__, c)))):
+        rest = sorted(cycle[1:])
+        for x in cycle[1:]:
+            i = rest.index(x)
+            rank = rank*len(rest) + i
+            rest.pop(i)
+    return rank
+
+
+def unrank_cycle_labelling(partition, rank, S=None):
+    """Return the cycles at position rank in cycle_labellings(partition,
+    S)."""
+    n = None if S is None else len(_elements(S))
+    if not 0 <= rank < cycle_index(partition, n):
+        raise IndexError("cycle labelling index out of range")
+    arrangements = 1
+    for l in partition:
+        arrangements *= factorial(l-1)
+    rank, arrangement = divmod(rank, arrangements)
+    division = unrank_set_partition(partition, rank, S)
+    S = _elements(sum(partition) if S is None else S)
+    index = dict(zip(S, range(len(S))))
+    bins = sorted(division, key=lambda b: (
+        len(b), min(map(index.__getitem__, b))))
+    cycles = []
+    for b in reversed(bins):
+        rest = sorted(b)
+        start = rest.pop(0)
+        # Decode the Lehmer code of the cycle, last digit first.
+        digits = []
+        for radix in range(1, len(rest)+1):
+            arrangement, digit = divmod(arrangement, radix)
+            digits.append(digit)
+        cycle = [start]
+        for digit in reversed(digits):
+            cycle.append(rest.pop(digit))
+        cycles.append(tuple.__new__(Necklace, cycle))
+    return frozenset(cycles)
+
+
+def random_cycle_labelling(partition, S=None):
+    """Return a uniformly random element of cycle_labellings(partition,
+    S); i.e. the cycles of a random permutation of S with the given cycle
+    type (with the leftover elements of S as fixed points)."""
+    n = None if S is None else len(_elements(S))
+    count = cycle_index(partition, n)
+    return unrank_cycle_labelling(partition, random.randrange(count), S)
+
+
+def _plain_changes(m):
+    """Return the positions j such that swapping the items at j and j+1 in
+    turn runs through every permutation of m items, by the plain changes
+    (Steinhaus-Johnson-Trotter) algorithm."""
+    perm = list(range(m))
+    position = list(range(m))
+    direction = [-1]*m
+    swaps = []
+    while True:
+        # Move the largest item whose neighbour in its direction is smaller.
+        for x in reversed(range(m)):
+            i = position[x]
+            j = i + direction[x]
+            if 0 <= j < m and perm[j] < x:
+                break
+        else:
+            return swaps
+        perm[i], perm[j] = perm[j], x
+        position[x], position[perm[i]] = j, i
+        swaps.append(min(i, j))
+        for y in range(x+1, m):
+            direction[y] = -direction[y]
+
+
+def cycle_type_permutations(partition, S=None, shared=False):
+    """Enumerate the Permutations of S with cycle type partition, where any
+    elements of S left over are fixed points.
+
+    Within each set partition of S into cycles, successive permutations
+    differ by conjugation by a transposition, which changes the images of
+    three elements. If shared is True, a list p is yielded instead, such
+    that each S[i] maps to S[p[i]]; the same list is yielded each time,
+    updated in place."""
+    S = _elements(sum(partition) if S is None else S)
+    if len(S) < sum(partition):
+        return iter(())
+    # Fixed points are interchangeable, so the 1-cycles of the partition go
+    # in the same bin as the leftover elements; binning them separately
+    # would generate each permutation once per way of choosing them.
+    cycles = [l for l in partition if l > 1]
+    shapes = _bin_shapes(cycles, S)
+    perms = _cycle_type_arrays(len(cycles), *shapes)
+    if shared:
+        return perms
+    return (Permutation(zip(S, map(S.__getitem__, p))) for p in perms)
+
+
+def _cycle_type_arrays(count, S, sizes, first):
+    perm = list(range(len(S)))
+    swaps = {}
+    for l in sizes[:count]:
+        if l not in swaps:
+            swaps[l] = _plain_changes(l-1)
+    for bins in _fill_bins(list(range(len(S))), sizes, first):
+        cycles = [b[:] for b in bins[:count]]
+        for x in chain.from_iterable(bins[count:]):
+            perm[x] = x
+        for cycle in cycles:
+            for i, x in enumerate(cycle):
+                perm[cycle[i-1]] = x
+        yield perm
+        # Walk through the orders of every cycle at once with a reflected
+        # mixed-radix Gray code, whose ith digit is the position of the ith
+        # cycle in the plain changes of the elements after its first.
+        sequences = [swaps[len(cycle)] for cycle in cycles]
+        digits = [0]*len(cycles)
+        directions = [1]*len(cycles)
+        while True:
+            for i in reversed(range(len(cycles))):
+                d = digits[i] + directions[i]
+                if 0 <= d <= len(sequences[i]):
+                    break
+            else:
+                break
+            j = sequences[i][min(d, digits[i])] + 1
+            digits[i] = d
+            for k in range(i+1, len(cycles)):
+                directions[k] = -directions[k]
+            cycle = cycles[i]
+            cycle[j], cycle[j+1] = cycle[j+1], cycle[j]
+            perm[cycle[j-1]] = cycle[j]
+            perm[cycle[j]] = cycle[j+1]
+            perm[cycle[j+1]] = cycle[(j+2) % len(cycle)]
+            yield perm
@@ -9,14 +9,14 @@ from heapq import nlargest
 from collections import Counter, Mapping
 from functools import reduce
 from itertools import chain, starmap, repeat
-from math import factorial
-from operator import itemgetter, mul
+from operator import add, and_, itemgetter, mul, or_, sub
 
-from funcstructs.compat import is_natural
+from funcstructs.compat import is_index, is_natural
+from funcstructs.combinat.factorials import factorial_prod as _factorial_prod
 
-from funcstructs.bases.frozendict import frozendict, _map_accessors
+from funcstructs.bases.frozendict import frozendict, _map_accessors, _cached
 
-__all__ = ["Multiset"]
+__all__ = ["Multiset", "IntMultiset"]
 
 
 def _prod(iterable):
@@ -24,27 +24,6 @@ def _prod(iterable):
     return reduce(mul, iterable, 1)
 
 
-def _factorial_prod(iterable):
-    """Product of factorial of elements in an iterable."""
-    return _prod(map(factorial, iterable))
-
-
-def _binop_template(name, map_get, map_set):
-    """Template for wrapping binary operations from Counter to Multiset"""
-    counter_op = getattr(Counter, name)
-
-    def binop(self, other):
-        if isinstance(other, Multiset):
-            other = Counter(map_get(other))
-        result = object.__new__(Multiset)
-        map_set(result, dict(counter_op(Counter(map_get(self)), other)))
-        return result
-    binop.__name__ = name
-    binop.__doc__ = counter_op.__doc__.replace("Counter", "Multiset").replace(
-        "counter", "multiset")
-    return binop
-
-
 def _rop_template(name, map_get, map_set):
     """Make reversed binary ops for Multiset using Counter methods."""
     binop = getattr(Counter, '__'+name[3:])
@@ -57,7 +36,7 @@ def _rop_template(name, map_get, map_set):
 
 
 def _MultisetHelper(ms_cls):
-    """Add Counter wrappers to Multiset."""
+    """Add constructor and arithmetic to Multiset."""
 
     map_set, map_get = _map_accessors()
 
@@ -98,8 +77,153 @@ def _MultisetHelper(ms_cls):
         return self
     ms_cls.__new__ = __new__
 
-    for op in ['__add__', '__sub__', '__and__', '__or__']:
-        setattr(ms_cls, op, _binop_template(op, map_get, map_set))
+    # Binary operations act directly on the internal dicts. As with
+    # Counter, the other operand may be a Counter (whose counts need not
+    # be positive) and only positive counts are kept. When both operands
+    # are Multisets, all counts are known to be positive, so we copy the
+    # larger dict and loop over the smaller. IntMultisets store counts in
+    # a tuple, so operations with them are deferred to IntMultiset.
+
+    def _result(mset):
+        result = object.__new__(Multiset)
+        map_set(result, mset)
+        return result
+
+    def __add__(self, other):
+        """Add counts from two multisets.
+
+        >>> Multiset('abbb') + Multiset('bcc')
+        Multiset({'a': 1, 'b': 4, 'c': 2})
+        """
+        if isinstance(other, IntMultiset):
+            return NotImplemented
+        mset = map_get(self)
+        if isinstance(other, Multiset):
+            other = map_get(other)
+            if len(other) > len(mset):
+                mset, other = other, mset
+            result = mset.copy()
+            for el, count in other.items():
+                result[el] = result.get(el, 0) + count
+        elif isinstance(other, Counter):
+            result = mset.copy()
+            for el, count in other.items():
+                count += result.get(el, 0)
+                if count > 0:
+                    result[el] = count
+                else:
+                    result.pop(el, None)
+        else:
+            return NotImplemented
+        return _result(result)
+    ms_cls.__add__ = __add__
+
+    def __sub__(self, other):
+        """Subtract count, but keep only results with positive counts.
+
+        >>> Multiset('abbbc') - Multiset('bccd')
+        Multiset({'a': 1, 'b': 2})
+        """
+        if isinstance(other, IntMultiset):
+            return NotImplemented
+        mset = map_get(self)
+        if isinstance(other, Multiset):
+            other = map_get(other)
+            result = mset.copy()
+            if len(other) < len(mset):
+                for el, count in other.items():
+                    if el in result:
+                        count = result[el] - count
+                        if count > 0:
+                            result[el] = count
+                        else:
+                            del result[el]
+                return _result(result)
+        elif not isinstance(other, Counter):
+            return NotImplemented
+        result = {}
+        get = other.get
+        for el, count in mset.items():
+            count -= get(el, 0)
+            if count > 0:
+                result[el] = count
+        for el, count in other.items():
+            if count < 0 and el not in mset:
+                result[el] = -count
+        return _result(result)
+    ms_cls.__sub__ = __sub__
+
+    def __or__(self, other):
+        """Union is the maximum of value in either of the input multisets.
+
+        >>> Multiset('abbb') | Multiset('bcc')
+        Multiset({'a': 1, 'b': 3, 'c': 2})
+        """
+        if isinstance(other, IntMultiset):
+            return NotImplemented
+        mset = map_get(self)
+        if isinstance(other, Multiset):
+            other = map_get(other)
+            if len(other) > len(mset):
+                mset, other = other, mset
+            result = mset.copy()
+            for el, count in other.items():
+                if count > result.get(el, 0):
+                    result[el] = count
+        elif isinstance(other, Counter):
+            result = mset.copy()
+            for el, count in other.items():
+                if count > result.get(el, 0):
+                    result[el] = count
+        else:
+            return NotImplemented
+        return _result(result)
+    ms_cls.__or__ = __or__
+
+    def __and__(self, other):
+        """Intersection is the minimum of corresponding counts.
+
+        >>> Multiset('abbb') & Multiset('bcc')
+        Multiset({'b': 1})
+        """
+        if isinstance(other, IntMultiset):
+            return NotImplemented
+        mset = map_get(self)
+        if isinstance(other, Multiset):
+            other = map_get(other)
+            if len(other) < len(mset):
+                mset, other = other, mset
+        elif not isinstance(other, Counter):
+            return NotImplemented
+        result = {}
+        get = other.get
+        for el, count in mset.items():
+            other_count = get(el, 0)
+            if other_count < count:
+                count = other_count
+            if count > 0:
+                result[el] = count
+        return _result(result)
+    ms_cls.__and__ = __and__
+
+    @staticmethod
+    def sum(multisets):
+        """Return the sum of an iterable of multisets, accumulating all of
+        the counts in a single dict. Items which are not multisets are
+        first converted as by Multiset().
+
+        >>> Multiset.sum([Multiset('ab'), Multiset('bc'), 'cd'])
+        Multiset({'a': 1, 'b': 2, 'c': 2, 'd': 1})
+        """
+        result = {}
+        get = result.get
+        for mset in multisets:
+            if not isinstance(mset, Multiset):
+                mset = Multiset(mset)
+            for el, count in mset._items():
+                result[el] = get(el, 0) + count
+        return _result(result)
+    ms_cls.sum = sum
 
     for rop in ['__radd__', '__rsub__', '__rand__', '__ror__']:
         setattr(ms_cls, rop, _rop_template(rop, map_get, map_set))
@@ -134,6 +258,9 @@ class Multiset(frozendict):
 
     __slots__ = ()
 
+    # Multisets are immutable, so their hashes only need computing once.
+    __hash__ = _cached(frozendict.__dict__['__hash__'])
+
     @classmethod
     def fromkeys(cls, iterable, v=None):
         raise NotImplementedError("%s.fromkeys() is undefined." % cls.__name__)
@@ -203,6 +330,206 @@ class Multiset(frozendict):
             return sorted(self._items(), key=itemgetter(1), reverse=True)
         return nlargest(n, self._items(), key=itemgetter(1))
 
+    @_cached
     def degeneracy(self):
         """Number of different representations of the same multiset."""
         return _factorial_prod(self._values())
+
+
+def _IntMultisetHelper(ims_cls):
+    """Add count array storage to IntMultiset."""
+
+    map_set, map_get = _map_accessors()
+
+    def from_counts(cls, counts):
+        """New cls instance from a list of valid counts, which is consumed."""
+        while counts and not counts[-1]:
+            counts.pop()
+        self = object.__new__(cls)
+        map_set(self, tuple(counts))
+        return self
+
+    def add_count(counts, el, count):
+        # bools are ints, but would read as counts of 0 and 1.
+        if isinstance(el, bool) or not (is_index(el) and el >= 0):
+            raise TypeError("IntMultiset elements must be non-negative ints")
+        if el >= len(counts):
+            counts.extend([0]*(el+1-len(counts)))
+        counts[el] += count
+
+    @staticmethod
+    def __new__(*args, **kwargs):  # signature allows using `cls` keyword arg
+        """Create a new IntMultiset from an iterable of non-negative ints,
+        or from a mapping of them to their multiplicities.
+
+        >>> IntMultiset([3, 1, 1])
+        IntMultiset({1: 2, 3: 1})
+        >>> IntMultiset({1: 2, 3: 1}) == Multiset([3, 1, 1])
+        True
+        """
+        if kwargs:
+            raise TypeError("IntMultiset does not accept keyword arguments")
+        if len(args) > 2:
+            raise TypeError("expected at most 1 argument, got %d" % len(args))
+        counts = []
+        if len(args) == 2:
+            iterable = args[1]
+            if isinstance(iterable, IntMultiset):
+                counts.extend(map_get(iterable))
+            elif isinstance(iterable, Mapping):
+                for el, count in iterable.items():
+                    if not is_natural(count):
+                        raise TypeError(
+                            "multiplicities must be positive integers")
+                    add_count(counts, el, count)
+            else:
+                for el in iterable:
+                    add_count(counts, el, 1)
+        return from_counts(args[0], counts)
+    ims_cls.__new__ = __new__
+
+    @classmethod
+    def fromcounts(cls, counts):
+        """Return the IntMultiset in which each i occurs counts[i] times.
+
+        >>> IntMultiset.fromcounts([0, 2, 0, 1])
+        IntMultiset({1: 2, 3: 1})
+        """
+        counts = list(counts)
+        if not all(is_index(c) and c >= 0 for c in counts):
+            raise TypeError("counts must be non-negative integers")
+        return from_counts(cls, counts)
+    ims_cls.fromcounts = fromcounts
+
+    @property
+    def counts(self):
+        """Tuple whose ith element is the multiplicity of i."""
+        return map_get(self)
+    ims_cls.counts = counts
+
+    # Mapping interface
+
+    def __contains__(self, el):
+        counts = map_get(self)
+        return is_index(el) and 0 <= el < len(counts) and counts[el] > 0
+    ims_cls.__contains__ = __contains__
+
+    def __getitem__(self, el):
+        if el in self:
+            return map_get(self)[el]
+        raise KeyError(el)
+    ims_cls.__getitem__ = __getitem__
+
+    def get(self, el, default=None):
+        if el in self:
+            return map_get(self)[el]
+        return default
+    ims_cls.get = get
+
+    def items(self):
+        return [(el, count) for el, count in enumerate(map_get(self))
+                if count]
+    ims_cls.items = ims_cls._items = items
+
+    def keys(self):
+        return [el for el, count in enumerate(map_get(self)) if count]
+    ims_cls.keys = ims_cls._keys = keys
+
+    def values(self):
+        return [count for count in map_get(self) if count]
+    ims_cls.values = ims_cls._values = values
+
+    if hasattr(dict, 'itervalues'):
+        ims_cls.viewitems = items
+        ims_cls.viewkeys = keys
+        ims_cls.viewvalues = values
+        ims_cls.iteritems = lambda self: iter(items(self))
+        ims_cls.iterkeys = lambda self: iter(keys(self))
+        ims_cls.itervalues = lambda self: iter(values(self))
+
+    def copy(self):
+        return dict(items(self))
+    ims_cls.copy = copy
+
+    def __reduce__(self):
+        return (self.__class__, (dict(items(self)), ))
+    ims_cls.__reduce__ = __reduce__
+
+    def __eq__(self, other):
+        if isinstance(other, IntMultiset):
+            return map_get(self) == map_get(other)
+        if isinstance(other, frozendict):
+            other = other.copy()
+        return dict(items(self)).__eq__(other)
+    ims_cls.__eq__ = __eq__
+
+    def __hash__(self):
+        # Equal to the hash of the Multiset with the same elements.
+        return hash(frozenset(items(self)))
+    ims_cls.__hash__ = _cached(__hash__)
+
+    def __len__(self):
+        return sum(map_get(self))
+    ims_cls.__len__ = __len__
+
+    def degeneracy(self):
+        return _factorial_prod(map_get(self))
+    degeneracy.__doc__ = Multiset.degeneracy.__doc__
+    ims_cls.degeneracy = _cached(degeneracy)
+
+    # Arithmetic takes O(k) time on the count arrays of two IntMultisets,
+    # where k is the largest element. Mixed operations convert self to a
+    # Multiset and return Multisets (or Counters).
+
+    def binop_template(name, op, combine):
+        multiset_op = getattr(Multiset, name)
+
+        def binop(self, other):
+            if not isinstance(other, IntMultiset):
+                return multiset_op(Multiset(copy(self)), other)
+            a = map_get(self)
+            b = map_get(other)
+            if len(a) < len(b):
+                a += (0, )*(len(b)-len(a))
+            else:
+                b += (0, )*(len(a)-len(b))
+            return from_counts(IntMultiset, list(map(combine, a, b)))
+        binop.__name__ = name
+        binop.__doc__ = multiset_op.__doc__
+        setattr(ims_cls, name, binop)
+
+        def rop(self, other):
+            return op(other, Multiset(copy(self)))
+        rop.__name__ = '__r' + name[2:]
+        setattr(ims_cls, rop.__name__, rop)
+
+    binop_template('__add__', add, add)
+    binop_template('__sub__', sub, lambda a, b: a - b if a > b else 0)
+    binop_template('__or__', or_, max)
+    binop_template('__and__', and_, min)
+
+    global _IntMultisetHelper
+    del _IntMultisetHelper
+
+    return ims_cls
+
+
+@_IntMultisetHelper
+class IntMultiset(Multiset):
+    """Multiset of non-negative integers, stored as a tuple of counts
+    indexed by element. IntMultisets compare and hash equal to Multisets
+    with the same elements, and may be used wherever they are expected.
+
+    They are compact and fast for multisets of small integers such as
+    cycle types and integer partitions:
+
+    >>> m = IntMultiset([3, 3, 2, 1])
+    >>> m.counts
+    (0, 1, 1, 2)
+    >>> m == Multiset([1, 2, 3, 3])
+    True
+    >>> m + IntMultiset([1])
+    IntMultiset({1: 2, 2: 1, 3: 2})
+    """
+
+    __slots__ = ()
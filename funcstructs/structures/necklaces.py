@@ -4,44 +4,53 @@ equivalent under cyclic rotation.
 Caleb Levy, 2014 and 2015.
 """
 
+import random
 from collections import Sequence
 from fractions import gcd
 from functools import reduce
-
-from PADS.Lyndon import SmallestRotation
+from itertools import chain, islice
 
 from funcstructs import bases
-from funcstructs.combinat import divisors, multinomial_coefficient
+from funcstructs.combinat import (
+    divisors, multinomial_coefficient, totient, factorial_table,
+    check_modulus
+)
 
 from .multiset import Multiset
 
 
+def smallest_rotation(strand):
+    """Return (i, p) such that strand[i:] + strand[:i] is the
+    lexicographically smallest rotation of strand, and p is its periodicity.
+
+    Runs Duval's Lyndon factorization over the strand read twice: the
+    smallest rotation begins at the last Lyndon factor starting in the first
+    copy, and the strand is a power of that factor, whose length is the
+    period. Takes O(len(strand)) comparisons."""
+    n = len(strand)
+    s = list(strand)*2
+    i = start = 0
+    period = n
+    while i < n:
+        start = i
+        j = i + 1
+        k = i
+        while j < 2*n and s[k] <= s[j]:
+            if s[k] < s[j]:
+                k = i
+            else:
+                k += 1
+            j += 1
+        period = j - k
+        while i <= k:
+            i += period
+    return start, period
+
+
 def periodicity(strand):
     """ Find the "periodicity" of a list; i.e. the number of its distinct
-    cyclic rotations. Algorithm proposed by Meng Wang (wangmeng@berkeley.edu)
-    runs in O(len(strand)). """
-    n = len(strand)
-    if n in {0, 1}:
-        return n
-    seed = []
-    l = p = 1
-    while p != n:
-        while n % l:
-            l += 1
-        p = l
-        seed.extend(strand[len(seed):p])
-        stop = False
-        for rep in range(l, n, l):
-            for i, val in enumerate(seed):
-                l += 1
-                if val != strand[rep + i]:
-                    stop = True
-                    break
-            if stop:
-                break
-        else:
-            break
-    return len(seed)
+    cyclic rotations. Runs in O(len(strand)). """
+    return smallest_rotation(strand)[1]
 
 
 class Necklace(bases.Tuple):
@@ -72,48 +81,279 @@ class Necklace(bases.Tuple):
         # instancechecks are expensive.
         if not isinstance(word, (tuple, list, Sequence)):
             word = tuple(word)
-        self = super(Necklace, cls).__new__(cls, SmallestRotation(word))
+        start = smallest_rotation(word)[0]
+        self = super(Necklace, cls).__new__(
+            cls, chain(islice(word, start, None), islice(word, start)))
         try:
             hash(self)
         except TypeError:
             raise TypeError("Necklace content must be hashable and immutable")
         return self
 
+    @classmethod
+    def normalize_all(cls, words):
+        """Return a list of the necklaces of each word in words.
+
+        Equivalent to [Necklace(word) for word in words], but words which are
+        repeated are only normalized once."""
+        seen = {}
+        necklaces = []
+        for word in words:
+            key = word if isinstance(word, tuple) else tuple(word)
+            try:
+                necklace = seen[key]
+            except KeyError:
+                necklace = seen[key] = cls(key)
+            necklaces.append(necklace)
+        return necklaces
+
     def degeneracy(self):
         """Number of distinct representations of the same necklace."""
         return len(self)//periodicity(self)
 
 
 def _sfc(multiplicities):
-    """Wrapper for partition necklaces, which takes a partition of
-    multiplicities and enumerates canonical necklaces on that partition."""
-    content = list(multiplicities)
-    a = [0]*sum(content)
-    content[0] -= 1
-    k = len(content)
-    return _simple_fixed_content(a, content, 2, 1, k)
-
-
-def _simple_fixed_content(a, content, t, p, k):
-    # This function is a result of refactoring of Sage's simple fixed content
+    """Generate the bead indices of each necklace with the given
+    multiplicities in lexicographic order. The same list is yielded each
+    time, updated in place."""
+    # This function began as a refactoring of Sage's simple fixed content
     # algorithm, featured in src/sage/combinat/neckalce.py as of December 23,
     # 2014. The original code was written by Mike Hansen <mhansen@gmail.com> in
     # 2007, who based his algorithm on Sawada, Joe. "A fast algorithm to
     # generate necklaces with fixed content", Theoretical Computer Science
     # archive Volume 301 , Issue 1-3, May 2003, which may be found in the
     # references.
-    n = len(a)
-    if t > n and not n % p:
+    #
+    # The recursive version passed each necklace up through as many as n
+    # generator frames. Here the recursion is moved to a managed stack: a
+    # holds the bead at each position, and periods[t] is the period of the
+    # prenecklace a[:t] (the "p" parameter of the recursive calls).
+    #
+    # As in Sawada's paper, the beads with remaining content are kept in a
+    # doubly linked list (with sentinel k) so that exhausted beads are never
+    # scanned. Beads are unlinked and relinked in stack order, so an
+    # exhausted bead's nxt pointer always leads upward to the next bead
+    # which is available, or was when it was unlinked.
+    content = list(multiplicities)
+    k = len(content)
+    n = sum(content)
+    a = [0]*n
+    if n == 1:
         yield a
-    else:
-        for j in range(a[t-p-1], k):
-            if content[j] > 0:
-                a[t-1] = j
-                content[j] -= 1
-                tp = p if(j == a[t-p-1]) else t
-                for z in _simple_fixed_content(a, content, t+1, tp, k):
-                    yield z
-                content[j] += 1
+        return
+    nxt = list(range(1, k+1)) + [0]
+    prv = [k] + list(range(k))
+    content[0] -= 1
+    if not content[0]:
+        nxt[k] = nxt[0]
+        prv[nxt[0]] = k
+    periods = [1]*(n+1)
+    t = 1
+    j = 0
+    while True:
+        while j != k and not content[j]:
+            j = nxt[j]
+        if j == k:
+            # Candidates for position t are exhausted; backtrack.
+            t -= 1
+            if not t:
+                return
+            j = a[t]
+            if not content[j]:
+                nxt[prv[j]] = prv[nxt[j]] = j
+            content[j] += 1
+            j = nxt[j]
+            continue
+        a[t] = j
+        content[j] -= 1
+        if not content[j]:
+            nxt[prv[j]] = nxt[j]
+            prv[nxt[j]] = prv[j]
+        p = periods[t] if j == a[t-periods[t]] else t+1
+        if t+1 == n:
+            if not n % p:
+                yield a
+            if not content[j]:
+                nxt[prv[j]] = prv[nxt[j]] = j
+            content[j] += 1
+            j = nxt[j]
+        else:
+            t += 1
+            periods[t] = p
+            j = a[t-p]
+
+
+# Ranking Necklaces
+# =================
+# Necklaces are enumerated in lexicographic order, so the rank of a strand
+# v is the number of necklaces which are smaller than it. More generally,
+# for a strand v of at most n beads, let below(v) be the number of
+# necklaces whose first len(v) beads are lexicographically smaller than v.
+# Since below(u + [c]) increases with c, the necklace at position k may be
+# found one bead at a time: extend its prefix u by the largest bead c with
+# below(u + [c]) <= k.
+#
+# Counting Words
+# --------------
+# A necklace is below v iff it begins with a "bad factor" v[:j] + [c]
+# with c < v[j]. Since necklaces are smallest rotations, a word of beads
+# has its necklace below v iff some rotation begins with a bad factor, or
+# equivalently, iff a bad factor occurs in the word read cyclically.
+#
+# We detect bad factors with the Knuth-Morris-Pratt automaton of v, whose
+# states are the lengths of the longest suffix read which is a prefix of
+# v. Since len(v) is at most the word length m, the state after reading a
+# word y depends only on y, not the starting state. Hence y is free of
+# cyclic bad factors iff it is a closed walk avoiding bad transitions
+# from precisely one state, and counting good words means counting
+# closed good walks of length m with the right bead content.
+#
+# Rather than start a walk at each state, rotate each good word so its
+# walk begins at a visit to state 0. If the walk of y' from 0 last left
+# state 0 r steps before returning, y' is the rotation of exactly r good
+# words whose walks first hit 0 at times 0, ..., r-1. Summing r over
+# closed good walks from 0 counts all good words whose walks hit state 0
+# at all. Every state has at most one non-bad transition to a state other
+# than 0, so the walks which never hit 0 run around the cycles of a
+# functional graph, and are counted directly.
+#
+# Counting Necklaces
+# ------------------
+# Let M be the bead multiplicities, n their sum and g their gcd. A word
+# with content M is of the form y^h only if h divides g. Counting words
+# below v of the form y^h for each such h, and applying Mobius inversion
+# to separate the words by period, gives Burnside's formula:
+#
+#   below(v) = sum(totient(h) * words_h(v) for h in divisors(g)) / n
+#
+# where words_h(v) counts words y of length m=n/h and content M/h with
+# necklace(y)^h below v. If len(v) <= m this is just words below v.
+# Otherwise necklace(y)^h is below v iff necklace(y) is below v[:m], or
+# it equals v[:m] and v[:m]^h is below v.
+
+
+def _prefix_automaton(v, k):
+    """Return tables (bound, delta) for reading beads in range(k) against
+    v. Reading c in state s completes a bad factor iff c < bound[s], and
+    otherwise moves to state delta[s][c]."""
+    L = len(v)
+    fail = [0]*(L+1)
+    j = 0
+    for i in range(1, L):
+        while j and v[i] != v[j]:
+            j = fail[j]
+        if v[i] == v[j]:
+            j += 1
+        fail[i+1] = j
+    bound = []
+    delta = []
+    for s in range(L+1):
+        # Prefixes of v which are suffixes of the input, longest first
+        borders = []
+        j = s
+        while True:
+            if j < L:
+                borders.append(j)
+            if not j:
+                break
+            j = fail[j]
+        bound.append(max(v[j] for j in borders))
+        row = [0]*k
+        for j in reversed(borders):
+            if v[j] < k:
+                row[v[j]] = j+1
+        delta.append(row)
+    return bound, delta
+
+
+def _words_below(multiplicities, v):
+    """Number of words with the given bead multiplicities having a
+    rotation whose first len(v) beads are lexicographically below v."""
+    k = len(multiplicities)
+    m = sum(multiplicities)
+    bound, delta = _prefix_automaton(v, k)
+    # Bead counts are packed into a single mixed-radix integer.
+    strides = []
+    full = 0
+    stride = 1
+    for mult in multiplicities:
+        strides.append(stride)
+        full += stride*mult
+        stride *= mult+1
+    moves = []
+    for s in range(len(v)+1):
+        moves.append([(strides[c], multiplicities[c], delta[s][c])
+                      for c in range(bound[s], k)])
+    # Map each (state, bead counts) reached from state 0 to the number of
+    # walks reaching it, and their total steps since last being in state 0.
+    walks = {(0, 0): (1, 0)}
+    good = 0
+    for _ in range(m):
+        steps = {}
+        for (s, used), (count, since) in walks.items():
+            since += count
+            for stride, mult, t in moves[s]:
+                if (used//stride) % (mult+1) == mult:
+                    continue
+                key = t, used+stride
+                if t:
+                    prev_count, prev_since = steps.get(key, (0, 0))
+                    steps[key] = prev_count+count, prev_since+since
+                elif key[1] == full:
+                    good += since
+                else:
+                    steps[key] = steps.get(key, (0, 0))[0]+count, 0
+        walks = steps
+    # Walks never visiting 0 follow the unique nonzero transitions.
+    succ = {}
+    for s in range(1, len(v)+1):
+        if bound[s] < k:
+            succ[s] = delta[s][bound[s]]
+    visited = set()
+    for s in succ:
+        path = []
+        while s in succ and s not in visited:
+            visited.add(s)
+            path.append(s)
+            s = succ[s]
+        if s in path:
+            cycle = path[path.index(s):]
+            if not m % len(cycle):
+                counts = [0]*k
+                for s in cycle:
+                    counts[bound[s]] += m//len(cycle)
+                if counts == list(multiplicities):
+                    good += len(cycle)
+    return multinomial_coefficient(multiplicities) - good
+
+
+def _is_necklace(strand, multiplicities):
+    """Test whether strand is a necklace with the given bead counts."""
+    for i, mult in enumerate(multiplicities):
+        if strand.count(i) != mult:
+            return False
+    start = smallest_rotation(strand)[0]
+    return strand[start:] + strand[:start] == strand
+
+
+def _necklaces_below(multiplicities, v):
+    """Number of necklaces with the given bead multiplicities whose first
+    len(v) beads are lexicographically below v."""
+    if not v:
+        return 0
+    v = list(v)
+    n = sum(multiplicities)
+    count = 0
+    for h in divisors(reduce(gcd, multiplicities)):
+        m = n//h
+        mults = [mult//h for mult in multiplicities]
+        words = _words_below(mults, v[:m])
+        if len(v) > m:
+            strand = v[:m]
+            if (strand*h)[:len(v)] < v and _is_necklace(strand, mults):
+                words += periodicity(strand)
+        count += totient(h) * words
+    return count//n
 
 
 class FixedContentNecklaces(bases.Enumerable):
@@ -142,11 +382,19 @@ class FixedContentNecklaces(bases.Enumerable):
         self.content = content
         self.multiplicities = multiplicities
 
-    def count_by_period(self):
+    def count_by_period(self, mod=None):
         """Returns a list whose kth element is the number of necklaces
-        corresponding to the input set of beads with k distinct rotations.
+        corresponding to the input set of beads with k distinct rotations,
+        modulo mod if given, which must be a prime greater than the number
+        of beads.
         """
         n = sum(self.multiplicities)
+        if mod is None:
+            multinomial = multinomial_coefficient
+        else:
+            check_modulus(mod, n)
+            table = factorial_table(mod)
+            multinomial = table.multinomial
         # Each period must be a divisor of the gcd of the multiplicities.
         w = reduce(gcd, self.multiplicities)
         baseperiod = n//w
@@ -160,7 +408,7 @@ class FixedContentNecklaces(bases.Enumerable):
             # corresponding to the subset of the multiplicity partition
             # featuring 1/factor of each kind of the original partiton's
             # elements.
-            mults[factor] = multinomial_coefficient(
+            mults[factor] = multinomial(
                 (i*factor)//w for i in self.multiplicities
             )
             # To enusre mults[factor] gives the number of character
@@ -174,11 +422,16 @@ class FixedContentNecklaces(bases.Enumerable):
             # Finally, normalize by the period: the number of distinct
             # rotations of any member of mults[factor], to obtain the number of
             # distinct necklaces with this period.
-            mults[factor] //= period
+            if mod is None:
+                mults[factor] //= period
+            else:
+                mults[factor] = mults[factor] * table.inverse(period) % mod
         return mults
 
-    def cardinality(self):
-        return sum(self.count_by_period())
+    def cardinality(self, mod=None):
+        if mod is None:
+            return sum(self.count_by_period())
+        return sum(self.count_by_period(mod)) % mod
 
     def __iter__(self):
         elem_get = self.content.__getitem__
@@ -187,6 +440,64 @@ class FixedContentNecklaces(bases.Enumerable):
             # necklaces in memory when constructing endofunction structures.
             yield tuple.__new__(Necklace, map(elem_get, strand))
 
+    def strands(self, shared=False):
+        """Generate the bead indices of each necklace as tuples, in the same
+        order as iteration. Index i refers to self.content[i].
+
+        If shared is True, a single list is yielded each time and updated in
+        place; it must be copied if it is to outlive the next step.
+        """
+        if shared:
+            return _sfc(self.multiplicities)
+        return (tuple(strand) for strand in _sfc(self.multiplicities))
+
+    def index_array(self):
+        """Return a 2-D numpy array whose rows are the bead indices of each
+        necklace, in the same order as iteration. Requires numpy."""
+        import numpy as np
+        strands = np.empty(
+            (self.cardinality(), sum(self.multiplicities)), dtype=np.intp)
+        for i, strand in enumerate(_sfc(self.multiplicities)):
+            strands[i] = strand
+        return strands
+
+    def rank(self, necklace):
+        """Return the position of necklace in the enumeration of self."""
+        if necklace not in self:
+            raise ValueError("%r is not in %r" % (necklace, self))
+        index = dict(zip(self.content, range(len(self.content))))
+        strand = [index[bead] for bead in necklace]
+        return _necklaces_below(self.multiplicities, strand)
+
+    def unrank(self, k):
+        """Return the necklace at position k in the enumeration of self."""
+        if not 0 <= k < self.cardinality():
+            raise IndexError("necklace index out of range")
+        mults = self.multiplicities
+        remaining = list(mults)
+        remaining[0] -= 1
+        strand = [0]
+        p = 1
+        for t in range(1, sum(mults)):
+            # Beads after strand[t-p] keep the strand a prenecklace; choose
+            # the last one that does not overshoot k.
+            candidates = [c for c in range(strand[t-p], len(mults))
+                          if remaining[c]]
+            for c in reversed(candidates[1:]):
+                if _necklaces_below(mults, strand + [c]) <= k:
+                    break
+            else:
+                c = candidates[0]
+            if c != strand[t-p]:
+                p = t+1
+            strand.append(c)
+            remaining[c] -= 1
+        return tuple.__new__(Necklace, map(self.content.__getitem__, strand))
+
+    def random_element(self):
+        """Return a necklace chosen uniformly at random from self."""
+        return self.unrank(random.randrange(self.cardinality()))
+
     @bases.typecheck(Necklace)
     def __contains__(self, other):
         m = Multiset(other)
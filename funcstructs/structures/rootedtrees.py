@@ -5,9 +5,13 @@ Caleb Levy, 2014-2015.
 
 from itertools import chain, groupby
 from math import factorial
+from operator import mul
 
 from funcstructs import bases
-from funcstructs.combinat import divisors, factorial_prod
+from funcstructs.bases.frozendict import _cached
+from funcstructs.combinat import (
+    divisors, factorial_prod, factorial_table, check_modulus
+)
 from funcstructs.compat import is_index, is_natural
 from funcstructs.utils.subsequences import startswith
 
@@ -15,7 +19,10 @@ from funcstructs.structures.functions import rangefunc
 from funcstructs.structures.multiset import Multiset
 from funcstructs.structures.labellings import _ordered_divisions
 
-__all__ = "LevelSequence", "DominantSequence", "RootedTree", "TreeEnumerator"
+__all__ = (
+    "LevelSequence", "DominantSequence", "RootedTree", "TreeEnumerator",
+    "tree_counts_upto"
+)
 
 
 def _levels_from_preim(graph, root=0, keys=None):
@@ -259,8 +266,8 @@ class DominantSequence(LevelSequence):
             rangefunc(self.parents()))
         n = len(self)
         func = [0] * n
-        for combo in _ordered_divisions(set(range(n)), bin_widths):
-            c = list(chain(*combo))
+        for bins in _ordered_divisions(list(range(n)), bin_widths):
+            c = list(chain(*bins))
             for i in range(n):
                 func[c[i]] = c[translation_sequence[i]]
             yield rangefunc(func)
@@ -306,6 +313,7 @@ class RootedTree(Multiset):
     def __str__(self):
         return self.__class__.__name__+"(%s)" % self._str()
 
+    @_cached
     def degeneracy(self):
         """Return #(nodes)!/#(labellings)"""
         deg = super(RootedTree, self).degeneracy()
@@ -319,6 +327,7 @@ class RootedTree(Multiset):
             level_sequence.extend(tree._ordered_level_sequence(level+1) * mult)
         return level_sequence
 
+    @_cached
     def __len__(self):
         """Number of nodes in the tree."""
         return len(self._ordered_level_sequence())
@@ -328,6 +337,69 @@ class RootedTree(Multiset):
         return DominantSequence(self._ordered_level_sequence())
 
 
+# Counting Rooted Trees
+# =====================
+# The number T[n] of rooted trees on n nodes satisfies
+#
+#   (n-1)*T[n] = sum(S[i]*T[n-i] for i in range(1, n))
+#
+# where S[i] is the sum of d*T[d] over the divisors d of i. This is
+# featured without derivation in Finch, S. R. "Otter's Tree Enumeration
+# Constants." Section 5.6 in "Mathematical Constants", Cambridge, England:
+# Cambridge University Press, pp. 295-316, 2003. S[n] is known as soon as
+# T[n] is, so the counts are kept in growable tables shared by every
+# TreeEnumerator, one for each modulus.
+
+
+class _TreeCounts(object):
+    """Growable table of the numbers of rooted trees, modulo mod if given,
+    which must then be a prime."""
+
+    def __init__(self, mod=None):
+        self.mod = mod
+        self.counts = [0, 1]
+        self._sums = [0, 1]
+
+    def extend(self, n):
+        """Count the trees on up to n nodes."""
+        T = self.counts
+        S = self._sums
+        mod = self.mod
+        if mod is not None:
+            inverse = factorial_table(mod).inverse
+        for m in range(len(T), n+1):
+            t = sum(map(mul, S[1:m], T[m-1:0:-1]))
+            if mod is None:
+                T.append(t//(m-1))
+                S.append(sum(d*T[d] for d in divisors(m)))
+            else:
+                T.append(t % mod * inverse(m-1) % mod)
+                S.append(sum(d*T[d] for d in divisors(m)) % mod)
+        return T
+
+
+_tree_counts = {}
+
+
+def _counts_upto(n, mod=None):
+    """The shared table of tree counts modulo mod, extended up to n."""
+    if mod is not None:
+        # Counting trees on n nodes divides by integers less than n.
+        check_modulus(mod, n-1)
+    try:
+        table = _tree_counts[mod]
+    except KeyError:
+        table = _tree_counts.setdefault(mod, _TreeCounts(mod))
+    return table.extend(n)
+
+
+def tree_counts_upto(n, mod=None):
+    """List whose kth element is the number of rooted trees on k nodes, for
+    k up to n, modulo mod if given, which must be a prime no less than
+    n."""
+    return _counts_upto(n, mod)[:n+1]
+
+
 class TreeEnumerator(bases.Enumerable):
     """Represents the class of unlabelled rooted trees on n nodes."""
 
@@ -401,18 +473,8 @@ class TreeEnumerator(bases.Enumerable):
     def __contains__(self, other):
         return len(other) == self.n
 
-    def cardinality(self):
-        """Returns the number of rooted tree structures on n nodes. Algorithm
-        featured without derivation in Finch, S. R. "Otter's Tree Enumeration
-        Constants." Section 5.6 in "Mathematical Constants", Cambridge,
-        England: Cambridge University Press, pp. 295-316, 2003."""
-        T = [0, 1] + [0]*(self.n - 1)
-        for n in range(2, self.n + 1):
-            for i in range(1, self.n):
-                s = 0
-                for d in divisors(i):
-                    s += T[d]*d
-                s *= T[n-i]
-                T[n] += s
-            T[n] //= n-1
-        return T[-1]
+    def cardinality(self, mod=None):
+        """Returns the number of rooted tree structures on n nodes, modulo
+        mod if given, which must be a prime no less than n. The counts are
+        cached, so later calls for at most n nodes are lookups."""
+        return _counts_upto(self.n, mod)[self.n]
@@ -54,6 +54,28 @@ class PartPartEnum(Enumerable):
         return iter(zip(self.part1, self.part2))
 
 
+class ListEnum(Enumerable):
+    def __init__(self, items):
+        self.items = list(items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class SquaresEnum(Enumerable):
+    def __init__(self, n):
+        self.n = n
+
+    def __iter__(self):
+        return (i*i for i in range(self.n))
+
+    def unrank(self, k):
+        return k*k
+
+    def _iter_range(self, start, stop):
+        return (k*k for k in range(start, stop))
+
+
 class EnumerableTests(unittest.TestCase):
 
     enumerators = [IntEnum1, IntEnum2, IntPartEnum, PartPartEnum]
@@ -165,3 +187,60 @@ class EnumerableTests(unittest.TestCase):
                     self.assertNotIn(sint(i), numobj)
                     self.assertNotIn(1.*i, intobj)
                     self.assertNotIn(1.*i, numobj)
+
+
+class EnumerableProtocolTests(unittest.TestCase):
+
+    def test_cardinality(self):
+        """Test counting by enumeration, including unhashable enumerables."""
+        for n in range(5):
+            self.assertEqual(n, IntEnum1(n).cardinality())
+            self.assertEqual(n+1, PartPartEnum(range(n+1), "abcde"[:n+1])
+                             .cardinality())
+        self.assertEqual(4, ListEnum("abcd").cardinality())
+
+    def test_getitem(self):
+        """Test indexing and slicing agree with list(e)."""
+        squares = SquaresEnum(10)
+        elements = list(squares)
+        for k in range(-10, 10):
+            self.assertEqual(elements[k], squares[k])
+        for s in [slice(None), slice(2, 7), slice(8, 2, -2), slice(-3, None),
+                  slice(1, 100, 3), slice(5, 3)]:
+            self.assertEqual(elements[s], squares[s])
+        with self.assertRaises(IndexError):
+            squares[10]
+        with self.assertRaises(TypeError):
+            squares["a"]
+        with self.assertRaises(TypeError):
+            IntEnum1(5)[0]
+
+    def test_chunks(self):
+        """Test chunks partition the enumeration in order."""
+        for n in range(10):
+            for size in range(1, 5):
+                chunks = list(IntEnum1(n).chunks(size))
+                self.assertEqual(list(range(n)), sum(chunks, []))
+                self.assertTrue(all(len(c) == size for c in chunks[:-1]))
+                self.assertEqual([[k*k for k in c] for c in chunks],
+                                 list(SquaresEnum(n).chunks(size)))
+        with self.assertRaises(ValueError):
+            list(IntEnum1(3).chunks(0))
+        with self.assertRaises(ValueError):
+            list(SquaresEnum(3).chunks(0))
+
+    def test_shard(self):
+        """Test shards partition the enumeration in order."""
+        for enum in [IntEnum1(10), SquaresEnum(11), IntEnum1(2)]:
+            for nshards in range(1, 5):
+                elements = []
+                for i in range(nshards):
+                    elements.extend(enum.shard(i, nshards))
+                self.assertEqual(list(enum), elements)
+        with self.assertRaises(ValueError):
+            IntEnum1(3).shard(3, 3)
+
+    def test_count_by(self):
+        """Test counting elements by the values of a key."""
+        self.assertEqual(
+            Counter({0: 4, 1: 3}), IntEnum1(7).count_by(lambda i: i % 2))
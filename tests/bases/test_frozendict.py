@@ -32,6 +32,38 @@ class FrozendictClassTests(unittest.TestCase):
         self.assertNotIn('_mapping', dir(frozendict))
         self.assertNotIn('__slots__', dir(frozendict()))
         self.assertNotIn('_mapping', dir(frozendict()))
+        self.assertFalse(hasattr(frozendict, '_cache'))
+        self.assertNotIn('_cache', dir(frozendict()))
+
+    def test_cached_methods(self):
+        """Test cached methods are computed once per object."""
+        from funcstructs.bases.frozendict import _cached
+        calls = []
+
+        class Cached(frozendict):
+            __slots__ = ()
+
+            @_cached
+            def total(self):
+                calls.append(self)
+                return sum(self.values())
+
+        class Derived(Cached):
+            __slots__ = ()
+
+            @_cached
+            def total(self):
+                return super(Derived, self).total() + 1
+
+        c = Cached(a=1, b=2)
+        d = Derived(a=1, b=2)
+        self.assertEqual(3, c.total())
+        self.assertEqual(3, c.total())
+        self.assertEqual([c], calls)
+        self.assertEqual(4, d.total())
+        self.assertEqual(4, d.total())
+        self.assertEqual([c, d], calls)
+        self.assertEqual(3, Cached(a=1, b=2).total())
 
 
 class F(frozendict):
@@ -0,0 +1,79 @@
+import unittest
+import pickle
+import random
+
+from funcstructs.bases.hamt import PersistentMapping
+
+
+class Collider(object):
+    """Key with a chosen hash, for forcing hash collisions."""
+
+    def __init__(self, value, h):
+        self.value = value
+        self.h = h
+
+    def __hash__(self):
+        return self.h
+
+    def __eq__(self, other):
+        return isinstance(other, Collider) and self.value == other.value
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class PersistentMappingTests(unittest.TestCase):
+
+    def test_set(self):
+        """Test each version agrees with the dict it was built alongside."""
+        rng = random.Random(0)
+        d = {}
+        m = PersistentMapping()
+        versions = []
+        for _ in range(500):
+            if rng.random() < 0.2:
+                key = Collider(rng.randrange(20), rng.choice([1, -1, 2**40]))
+            else:
+                key = rng.randrange(-300, 300)
+            d[key] = rng.randrange(10)
+            m = m.set(key, d[key])
+            versions.append((dict(d), m))
+        for d, m in versions:
+            self.assertEqual(len(d), len(m))
+            self.assertEqual(d, dict(m.items()))
+            self.assertEqual(set(d), set(m))
+            self.assertEqual(sorted(d.values()), sorted(m.values()))
+            for key, value in d.items():
+                self.assertEqual(value, m[key])
+
+    def test_constructor(self):
+        """Test building from mappings and pairs, later pairs winning."""
+        pairs = [(i % 37, i) for i in range(100)]
+        m = PersistentMapping(pairs)
+        self.assertEqual(dict(pairs), m)
+        self.assertEqual(m, PersistentMapping(m))
+        self.assertEqual(m, PersistentMapping().update(pairs))
+        self.assertEqual(m, PersistentMapping().update(dict(pairs)))
+        self.assertEqual({}, PersistentMapping())
+
+    def test_missing_keys(self):
+        m = PersistentMapping({Collider(0, 5): 0, 5: 1})
+        self.assertNotIn(Collider(1, 5), m)
+        self.assertNotIn(37, m)
+        self.assertIsNone(m.get(37))
+        with self.assertRaises(KeyError):
+            m[Collider(1, 5)]
+
+    def test_persistence(self):
+        """Test setting keys leaves the original mapping unchanged."""
+        m = PersistentMapping(zip(range(1000), range(1000)))
+        m2 = m.set(0, 'a').set(1000, 'b')
+        self.assertEqual(0, m[0])
+        self.assertNotIn(1000, m)
+        self.assertEqual(1000, len(m))
+        self.assertEqual(1001, len(m2))
+        self.assertEqual('a', m2[0])
+
+    def test_pickle(self):
+        m = PersistentMapping(zip("abc", range(3)))
+        self.assertEqual(m, pickle.loads(pickle.dumps(m)))
@@ -0,0 +1,39 @@
+"""Benchmarking the shared factorial table.
+
+Counting endofunction structures takes factorials of the same small
+arguments over and over, mostly of multiplicities when computing
+degeneracies. This reports how often iterdist finds its factorials
+already in the table, and how table lookups compare with math.factorial.
+"""
+
+from __future__ import print_function
+
+import math
+import timeit
+
+from funcstructs.combinat import factorial_table
+from funcstructs.structures.funcdists import iterdist
+
+table = factorial_table()
+
+print("iterdist factorial lookups:")
+print("---------------------------")
+for n in range(4, 11):
+    hits, misses = table.hits, table.misses
+    iterdist(n)
+    hits, misses = table.hits - hits, table.misses - misses
+    print("n = %2d: %8d lookups, %6.2f%% hits" % (
+        n, hits + misses, 100.0*hits/max(hits + misses, 1)))
+
+print()
+print("Factorials of range(n), 1000 times:")
+print("-----------------------------------")
+for n in [20, 100, 500]:
+    table.extend(n)
+    print(
+        "n = %3d: math.factorial %.4fs, table %.4fs" % (
+            n,
+            timeit.timeit(lambda: list(map(math.factorial, range(n))),
+                          number=1000),
+            timeit.timeit(lambda: list(map(table.factorial, range(n))),
+                          number=1000)))
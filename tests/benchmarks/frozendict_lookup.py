@@ -0,0 +1,42 @@
+"""Benchmarking Function evaluation against builtin dict lookups.
+
+Subscripting a frozendict goes through a python-level __getitem__, while
+the Function methods which evaluate it in loops subscript the internal
+dict directly.
+"""
+
+from __future__ import print_function
+
+import timeit
+
+setup = """\
+from funcstructs import rangefunc
+f = rangefunc(list(range(1, {n})) + [0])
+d = dict(f.items())
+items = list(f)
+"""
+
+lookups = [
+    ("dict lookup", "for x in range({n}): d[x]"),
+    ("Function lookup", "for x in range({n}): f[x]"),
+    ("dict iteration", "for x in d: pass"),
+    ("Function iteration", "for x, y in f: pass"),
+    ("dict items", "for x, y in d.items(): pass"),
+    ("Function items", "for x, y in f.items(): pass"),
+    ("dict composition", "{{x: d[y] for x, y in d.items()}}"),
+    ("Function composition", "f * f"),
+    ("Function cycles", "f.cycles()"),
+    ("new Function cycles", "type(f)(items).cycles()"),
+]
+
+if __name__ == '__main__':
+    print("Function evaluation:")
+    print("--------------------")
+    for n, number in [(5, 100000), (10, 50000), (1000, 500)]:
+        print("n = %s:" % n)
+        for name, stmt in lookups:
+            print(
+                '    ' + name + ':',
+                min(timeit.repeat(stmt.format(n=n), setup.format(n=n),
+                                  number=number, repeat=5))
+            )
@@ -1,8 +1,17 @@
 import unittest
+from itertools import product
+
+try:
+    from math import gcd
+except ImportError:  # Python 2
+    from fractions import gcd
 
 from funcstructs.combinat import (
-    nCk, prod, compositions, weak_compositions, prime_factorization, divisors
+    nCk, prod, compositions, weak_compositions, prime_factorization, divisors,
+    totient, mobius, weak_composition_count, rank_composition,
+    unrank_composition, rank_weak_composition, unrank_weak_composition
 )
+from funcstructs.combinat.primes import FactorSieve
 
 
 class CompositionTests(unittest.TestCase):
@@ -36,6 +45,49 @@ class CompositionTests(unittest.TestCase):
                 for comp in weak_compositions(n, k):
                     self.assertEqual(n, sum(comp))
 
+    def test_bounded_weak_compositions(self):
+        """Test bounded weak compositions against brute force."""
+        for bounds in [[2, 0, 3], [1, 1, 1, 1], [3], [], [4, 2, 5, 1]]:
+            words = sorted(product(*[range(b+1) for b in bounds]))
+            for n in range(-1, sum(bounds)+2):
+                comps = [c for c in words if sum(c) == n]
+                self.assertEqual(
+                    comps, list(map(tuple, weak_compositions(
+                        n, len(bounds), bounds))))
+                self.assertEqual(
+                    len(comps), weak_composition_count(n, len(bounds), bounds))
+        with self.assertRaises(ValueError):
+            list(weak_compositions(3, 2, [1]))
+
+    def test_shared(self):
+        """Test shared mode yields the same list each time."""
+        for comps in [compositions(5, shared=True),
+                      weak_compositions(5, 3, shared=True)]:
+            comps = list(comps)
+            for comp in comps:
+                self.assertIs(comps[0], comp)
+
+    def test_rank_unrank(self):
+        """Test rank and unrank agree with the enumeration order."""
+        for n in range(1, 9):
+            for i, comp in enumerate(compositions(n)):
+                self.assertEqual(i, rank_composition(comp))
+                self.assertEqual(comp, unrank_composition(n, i))
+            with self.assertRaises(IndexError):
+                unrank_composition(n, 2**(n-1))
+        for n, k, bounds in [(4, 3, None), (6, 4, [3, 1, 2, 4]), (0, 2, None)]:
+            for i, comp in enumerate(weak_compositions(n, k, bounds)):
+                self.assertEqual(i, rank_weak_composition(comp, bounds))
+                self.assertEqual(
+                    comp, unrank_weak_composition(n, k, i, bounds))
+            with self.assertRaises(IndexError):
+                unrank_weak_composition(
+                    n, k, weak_composition_count(n, k, bounds), bounds)
+        with self.assertRaises(ValueError):
+            rank_composition([2, 0, 1])
+        with self.assertRaises(ValueError):
+            rank_weak_composition([3, 1], [2, 2])
+
 
 class FactorizationTests(unittest.TestCase):
 
@@ -50,3 +102,30 @@ class FactorizationTests(unittest.TestCase):
                    4, 4, 2, 8, 3, 4, 4, 6, 2, 8]
         for i, count in enumerate(A000005, start=1):
             self.assertEqual(count, len(divisors(i)))
+
+    def test_divisors(self):
+        """Check divisors are sorted and agree with brute force."""
+        for n in range(1, 200):
+            self.assertEqual(
+                tuple(d for d in range(1, n+1) if n % d == 0), divisors(n))
+
+    def test_totient_mobius(self):
+        """Check totients and Mobius values against their definitions."""
+        for n in range(1, 200):
+            self.assertEqual(
+                sum(1 for k in range(1, n+1) if gcd(k, n) == 1), totient(n))
+            # The Mobius function sums to zero over the divisors of n > 1.
+            self.assertEqual(int(n == 1), sum(map(mobius, divisors(n))))
+
+    def test_sieve_limit(self):
+        """Check integers beyond the sieve limit are factored correctly."""
+        s = FactorSieve(limit=50)
+        for n in [1, 49, 53, 97*89, 2**7*3**4, 2*(2**31 - 1), 4099**2]:
+            self.assertEqual(n, prod(s.prime_factorization(n)))
+            self.assertEqual(prime_factorization(n), s.prime_factorization(n))
+            self.assertEqual(divisors(n), s.divisors(n))
+            self.assertEqual(totient(n), s.totient(n))
+            self.assertEqual(mobius(n), s.mobius(n))
+        self.assertEqual(50, s.size)
+        with self.assertRaises(ValueError):
+            s.divisors(0)
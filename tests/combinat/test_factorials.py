@@ -0,0 +1,81 @@
+import unittest
+from math import factorial
+
+from funcstructs.combinat.factorials import (
+    FactorialTable,
+    factorial_table,
+    check_modulus,
+    binomial,
+    multinomial
+)
+
+
+def _multinomial(partition, n):
+    count = factorial(n)//factorial(n - sum(partition))
+    for p in partition:
+        count //= factorial(p)
+    return count
+
+
+class FactorialTableTests(unittest.TestCase):
+
+    def test_exact(self):
+        """Test exact factorials and binomials, including past the limit."""
+        t = FactorialTable(limit=20)
+        for n in range(40):
+            self.assertEqual(factorial(n), t.factorial(n))
+            for k in range(-1, n+2):
+                if 0 <= k <= n:
+                    count = factorial(n)//factorial(k)//factorial(n-k)
+                else:
+                    count = 0
+                self.assertEqual(count, t.binomial(n, k))
+        self.assertEqual(20, t.size)
+        with self.assertRaises(ValueError):
+            t.factorial(-1)
+
+    def test_modular(self):
+        """Test modular tables agree with exact values mod a prime."""
+        for p in [2, 7, 13]:
+            t = FactorialTable(mod=p)
+            for n in range(3*p):
+                self.assertEqual(factorial(n) % p, t.factorial(n))
+                for k in range(n+1):
+                    self.assertEqual(binomial(n, k) % p, t.binomial(n, k))
+            for n in range(p):
+                self.assertEqual(1, t.factorial(n)*t.inverse_factorial(n) % p)
+            with self.assertRaises(ValueError):
+                t.inverse_factorial(p)
+        with self.assertRaises(ValueError):
+            FactorialTable().inverse_factorial(1)
+        for mod in [0, 1, 9, 15, 21, 25, 1000001]:
+            with self.assertRaises(ValueError):
+                FactorialTable(mod=mod)
+
+    def test_check_modulus(self):
+        """Test moduli must be primes greater than the given bound."""
+        check_modulus(7, 6)
+        for mod, n in [(7, 7), (9, 4), (15, 8), (2, 3)]:
+            with self.assertRaises(ValueError):
+                check_modulus(mod, n)
+
+    def test_multinomial(self):
+        """Test multinomial coefficients, exact and modular."""
+        t = factorial_table(11)
+        self.assertIs(t, factorial_table(11))
+        for partition in [[], [3], [2, 2, 1], [5, 4, 7], [12, 3]]:
+            total = sum(partition)
+            for n in [total, total + 3]:
+                count = _multinomial(partition, n)
+                self.assertEqual(count, multinomial(partition, n))
+                self.assertEqual(count % 11, t.multinomial(partition, n))
+            self.assertEqual(0, multinomial(partition, total-1))
+
+    def test_hits(self):
+        """Test repeated lookups are counted as hits."""
+        t = FactorialTable()
+        t.factorial(10)
+        self.assertEqual((0, 1), (t.hits, t.misses))
+        for n in range(11):
+            t.factorial(n)
+        self.assertEqual((11, 1), (t.hits, t.misses))
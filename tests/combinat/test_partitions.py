@@ -0,0 +1,97 @@
+import unittest
+from collections import Counter
+
+from funcstructs.combinat.partitions import (
+    partitions,
+    fixed_length_partitions,
+    max_length_partitions,
+    multiplicities,
+    multiplicity_partitions,
+    partition_number,
+    partition_numbers_upto,
+    rank_partition,
+    unrank_partition
+)
+
+A000041 = [1, 1, 2, 3, 5, 7, 11, 15, 22, 30, 42, 56, 77, 101, 135]
+
+
+class PartitionTests(unittest.TestCase):
+
+    def test_partitions(self):
+        """Test partitions are distinct, valid and in reverse lex order."""
+        for n, count in enumerate(A000041):
+            parts = [list(p) for p in partitions(n)]
+            self.assertEqual(count, len(parts))
+            self.assertEqual(sorted(parts, reverse=True), parts)
+            for p in parts:
+                self.assertEqual(n, sum(p))
+                self.assertEqual(sorted(p, reverse=True), p)
+        self.assertEqual([], list(partitions(-1)))
+
+    def test_fixed_length_partitions(self):
+        """Test fixed length partitions are those of partitions with k
+        parts."""
+        for n in range(12):
+            parts = [tuple(p) for p in partitions(n)]
+            for k in range(n+2):
+                fixed = [tuple(p) for p in fixed_length_partitions(n, k)]
+                self.assertEqual(
+                    sorted(p for p in parts if len(p) == k), sorted(fixed))
+                self.assertEqual(len(fixed), partition_number(n, k))
+
+    def test_max_length_partitions(self):
+        """Test max length partitions are those with at most k parts."""
+        for n in range(12):
+            parts = [tuple(p) for p in partitions(n)]
+            for k in range(n+2):
+                bounded = [tuple(p) for p in max_length_partitions(n, k)]
+                self.assertEqual(
+                    sorted(p for p in parts if len(p) <= k), sorted(bounded))
+
+    def test_multiplicities(self):
+        """Test multiplicity form counts the parts of each partition."""
+        for partition in partitions(10):
+            items = multiplicities(partition)
+            self.assertEqual(Counter(partition), Counter(dict(items)))
+            self.assertEqual(sorted(items, reverse=True), items)
+
+    def test_multiplicity_partitions(self):
+        """Test multiplicity form partitions follow partitions(n)."""
+        for n in range(15):
+            self.assertEqual(
+                [multiplicities(p) for p in partitions(n)],
+                [list(zip(*pm)) for pm in multiplicity_partitions(n)])
+
+    def test_partition_number(self):
+        """OEIS A000041: number of partitions of n."""
+        for n, count in enumerate(A000041):
+            self.assertEqual(count, partition_number(n))
+            self.assertEqual(
+                count, sum(partition_number(n, k) for k in range(n+1)))
+        self.assertEqual(0, partition_number(-1))
+
+    def test_modular_partition_numbers(self):
+        """Test partition numbers modulo a prime."""
+        p = 1009
+        counts = partition_numbers_upto(300)
+        self.assertEqual([c % p for c in counts],
+                         partition_numbers_upto(300, p))
+        for n in range(30):
+            for k in range(n+1):
+                self.assertEqual(partition_number(n, k) % p,
+                                 partition_number(n, k, p))
+
+    def test_rank_unrank(self):
+        """Test rank and unrank agree with the enumeration order."""
+        for n in range(12):
+            for i, partition in enumerate(partitions(n)):
+                self.assertEqual(i, rank_partition(partition))
+                self.assertEqual(partition, unrank_partition(n, i))
+            with self.assertRaises(IndexError):
+                unrank_partition(n, partition_number(n))
+        p = unrank_partition(100, 123456789)
+        self.assertEqual(100, sum(p))
+        self.assertEqual(123456789, rank_partition(p))
+        with self.assertRaises(ValueError):
+            rank_partition([1, 2])
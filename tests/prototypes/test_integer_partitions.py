@@ -1,6 +1,6 @@
 import unittest
 
-from PADS import IntegerPartitions
+from funcstructs.combinat.partitions import partitions
 
 from funcstructs.prototypes.integer_partitions import (
     isqrt,
@@ -32,7 +32,7 @@ class LevyPartitionTests(unittest.TestCase):
         """Check that the fixed length lex partition outputs are correct."""
         N = 15
         for n in range(N):
-            pn = [list(p) for p in IntegerPartitions.lex_partitions(n)]
+            pn = [list(p) for p in partitions(n)][::-1]
             np = 0
             for L in range(n+1):
                 pnL = [list(p) for p in fixed_lex_partitions(n, L)]
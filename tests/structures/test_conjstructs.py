@@ -1,8 +1,13 @@
 import unittest
+from fractions import Fraction
 from math import factorial
 
+from funcstructs.combinat import divisors
+from funcstructs.combinat.partitions import partitions, multiplicity_partitions
 from funcstructs.structures import (
     randfunc,
+    randconj,
+    Function,
     Endofunction,
     DominantSequence,
     Multiset,
@@ -11,10 +16,29 @@ from funcstructs.structures import (
 
 from funcstructs.structures.conjstructs import (
     ConjugacyClass,
-    Funcstructs
+    are_conjugate,
+    conjugating_bijection,
+    StructureIndex,
+    Funcstructs,
+    funcstruct_counts_upto
 )
 
 
+def de_bruijn_count(n):
+    """Number of endofunction structures on n nodes by De Bruijn's formula
+    in "Enumeration of Mapping Patterns", Journal of Combinatorial Theory,
+    Volume 12, 1972."""
+    tot = 0
+    for lengths, mults in multiplicity_partitions(n):
+        part = dict(zip(lengths, mults))
+        p = 1
+        for i, b in part.items():
+            s = sum(j*part.get(j, 0) for j in divisors(i))
+            p *= s**b * Fraction(i, 1)**(-b)/factorial(b)
+        tot += p
+    return int(tot)
+
+
 class ConjugacyClassTests(unittest.TestCase):
 
     s = ConjugacyClass([
@@ -58,6 +82,40 @@ class ConjugacyClassTests(unittest.TestCase):
         for n, count in enumerate(A001372, start=1):
             self.assertEqual(count, len(set(Funcstructs(n))))
             self.assertEqual(count, Funcstructs(n).cardinality())
+        self.assertEqual([1] + A001372, funcstruct_counts_upto(12))
+        self.assertEqual(2, Funcstructs(3, [1]).cardinality())
+
+    def test_struct_count_formula(self):
+        """Test structure counts against De Bruijn's formula."""
+        counts = funcstruct_counts_upto(25)
+        for n in range(26):
+            self.assertEqual(de_bruijn_count(n), counts[n])
+
+    def test_modular_counts(self):
+        """Test counting structures modulo a prime."""
+        for p in [23, 1000003]:
+            for n in range(1, 23):
+                structs = Funcstructs(n)
+                self.assertEqual(
+                    structs.cardinality() % p, structs.cardinality(p))
+        for mod in [9, 21, 25, 5]:
+            with self.assertRaises(ValueError):
+                Funcstructs(6).cardinality(mod)
+            with self.assertRaises(ValueError):
+                Funcstructs(6, [1, 2]).cardinality(mod)
+
+    def test_cycle_type_counts(self):
+        """Test structures of each cycle type partition all structures."""
+        A001372 = [1, 3, 7, 19, 47, 130, 343]
+        for n, count in enumerate(A001372, start=1):
+            total = 0
+            for i in range(1, n+1):
+                for partition in partitions(i):
+                    cycle_type = Multiset(partition)
+                    for struct in Funcstructs(n, cycle_type):
+                        self.assertEqual(cycle_type, struct.cycle_type)
+                        total += 1
+            self.assertEqual(count, total)
 
     def test_degeneracy(self):
         """OEIS A000312: Number of labeled maps from n points to themselves."""
@@ -73,7 +131,70 @@ class ConjugacyClassTests(unittest.TestCase):
         self.assertEqual(15, len(self.s))
         self.assertEqual(30, len(ConjugacyClass(randfunc(30))))
 
+    def test_are_conjugate(self):
+        """Test conjugacy agrees with equality of conjugacy classes."""
+        funcs = [struct.func_form() for struct in Funcstructs(6)]
+        for f in funcs:
+            g = randconj(f, "abcdef")
+            self.assertTrue(are_conjugate(f, g))
+            b = conjugating_bijection(f, g)
+            self.assertEqual(g, b.conj(f))
+            self.assertEqual(f, b.inverse.conj(g))
+        for f in funcs[::7]:
+            for g in funcs:
+                self.assertEqual(f == g, are_conjugate(f, g))
+                self.assertEqual(f == g, conjugating_bijection(f, g)
+                                 is not None)
+        # Equal size, fiber sizes and cycle type, but not depths.
+        f = Endofunction(enumerate([0, 0, 0, 1, 2]))
+        g = Endofunction(enumerate([0, 0, 0, 1, 3]))
+        self.assertFalse(are_conjugate(f, g))
+        self.assertIsNone(conjugating_bijection(f, g))
+        with self.assertRaises(TypeError):
+            are_conjugate(funcs[0], randfunc(6, "abcdef"))
+
+    def test_conjugating_bijection(self):
+        """Test witnesses for large random conjugates."""
+        for _ in range(10):
+            f = randfunc(500)
+            g = randconj(f)
+            self.assertEqual(g, conjugating_bijection(f, g).conj(f))
+
     def test_repr(self):
         """Ensure an endofunction structure evaluates to itself"""
         struct = ConjugacyClass(randfunc(30))
         self.assertEqual(struct, eval(repr(struct)))
+
+
+class StructureIndexTests(unittest.TestCase):
+
+    def test_counts(self):
+        """Test counts agree with counting conjugacy classes directly."""
+        funcs = [randfunc(7) for _ in range(300)]
+        funcs += [randconj(f) for f in funcs[:100]]
+        index = StructureIndex(funcs[:200])
+        for f in funcs[200:]:
+            index.add(f)
+        counts = Multiset(map(ConjugacyClass, funcs))
+        self.assertEqual(len(counts.keys()), len(index))
+        for f in funcs:
+            self.assertIn(f, index)
+            self.assertEqual(counts[ConjugacyClass(f)], index.count(f))
+        self.assertEqual(
+            counts, Multiset.fromitems(
+                (ConjugacyClass(f), c) for f, c in index.items()))
+        self.assertEqual(len(index), len(list(index)))
+
+    def test_missing(self):
+        """Test lookups of absent classes do not change the index."""
+        index = StructureIndex()
+        for struct in Funcstructs(5):
+            f = struct.func_form()
+            self.assertNotIn(f, index)
+            self.assertEqual(0, index.count(f))
+            index.add(f, 2)
+            self.assertEqual(2, index.count(f))
+        self.assertEqual(47, len(index))
+        self.assertNotIn(Function({0: 'a'}), index)
+        with self.assertRaises(TypeError):
+            index.add(Function({0: 'a'}))
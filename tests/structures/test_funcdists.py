@@ -7,7 +7,7 @@ from funcstructs import combinat
 from funcstructs.structures.funcdists import (
     iterdist_brute,
     iterdist_funcstruct, iterdist,
-    imagedist_composition, imagedist_recurse,
+    imagedist_composition, imagedist_recurse, imagedists_upto,
     nCk_grid,
     powergrid,
     limitdist_composition, limitdist_direct, limitdist_recurse
@@ -38,6 +38,7 @@ class FundistTests(unittest.TestCase):
         for dist in iterdists:
             n = dist.shape[0]
             np.testing.assert_array_equal(dist, iterdist_brute(n))
+            np.testing.assert_array_equal(dist, iterdist_brute(n, 2))
             np.testing.assert_array_equal(dist, iterdist_funcstruct(n))
 
     def test_rootedtree_funcs(self):
@@ -110,3 +111,15 @@ class FundistTests(unittest.TestCase):
             self.assertSequenceEqual(dist, limitdist_composition(n))
             self.assertSequenceEqual(dist, limitdist_direct(n))
             self.assertSequenceEqual(dist, limitdist_recurse(n))
+
+    def test_modular_dists(self):
+        """Test distributions modulo a prime agree with the exact ones."""
+        p = 101
+        for n in range(2, 8):
+            np.testing.assert_array_equal(
+                iterdist_funcstruct(n) % p, iterdist_funcstruct(n, mod=p))
+        for n in range(1, 40):
+            np.testing.assert_array_equal(
+                imagedists_upto(n) % p, imagedists_upto(n, p))
+            self.assertSequenceEqual(
+                [c % p for c in limitdist_direct(n)], limitdist_direct(n, p))
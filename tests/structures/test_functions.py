@@ -1,11 +1,19 @@
 import unittest
+import pickle
 from math import factorial
+from random import randrange
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from funcstructs.structures.conjstructs import ConjugacyClass
 
 from funcstructs.structures.functions import (
     Function, Bijection, Endofunction, Permutation,
     identity, rangefunc, randfunc, randperm, randconj,
+    randfunc_array, randperm_array, randconj_array,
     Mappings, Isomorphisms, TransformationMonoid, SymmetricGroup
 )
 
@@ -66,6 +74,34 @@ class FunctionTests(unittest.TestCase):
                 self.assertNotIn(xy[1], f)
                 self.assertNotIn(xy[1:], f)
 
+    def test_set(self):
+        """Test persistent updates agree with building a new Function."""
+        f = randfunc(20)
+        steps = [(randrange(25), randrange(25)) for _ in range(200)]
+        d = dict(f)
+        for x, y in steps:
+            g = f.set(x, y)
+            d[x] = y
+            self.assertEqual(Function(d), g)
+            self.assertIs(type(Function(d)), type(g))
+            self.assertEqual(hash(Function(d)), hash(g))
+            f = g
+        self.assertEqual(Function(d), pickle.loads(pickle.dumps(f)))
+        self.assertEqual(Function(d), f.update([]))
+
+    def test_update(self):
+        """Test updates promote and demote the Function type."""
+        p = Permutation(zip(range(5), [1, 2, 3, 4, 0]))
+        f = p.update({0: 2, 4: 0})
+        self.assertIs(Endofunction, type(f))
+        self.assertIs(Permutation, type(f.set(1, 1)))
+        self.assertIs(Bijection, type(f.set(1, 'a')))
+        self.assertIs(Function, type(f.set(3, 'a')))
+        self.assertEqual(p, p.update([(0, 1)]))
+        self.assertEqual({0: 1, 1: 2, 2: 3, 3: 4, 4: 0}, p.copy())
+        with self.assertRaises(TypeError):
+            p.set(0, [])
+
 
 class BijectionTests(unittest.TestCase):
 
@@ -289,6 +325,40 @@ class RandfuncTests(unittest.TestCase):
         self.assertEqual(g.domain, cg.domain)
         self.assertEqual(f.domain, cdg.domain)
 
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_random_arrays(self):
+        """Test batches of random functions are valid and reproducible."""
+        for dom, cod in [(5, None), ("abcd", range(7)), (range(6), "abcdef")]:
+            mappings = Mappings(dom, cod)
+            funcs = randfunc_array(20, dom, cod, seed=1)
+            self.assertEqual((20, len(mappings.domain)), funcs.shape)
+            self.assertTrue(((0 <= funcs) & (funcs < len(mappings.codomain))
+                             ).all())
+            np.testing.assert_array_equal(
+                funcs, randfunc_array(20, dom, cod, seed=1))
+            if len(mappings.domain) == len(mappings.codomain):
+                perms = randperm_array(20, dom, cod, seed=2)
+                for perm in perms:
+                    self.assertEqual(list(range(len(perm))), sorted(perm))
+        with self.assertRaises(TypeError):
+            randperm_array(3, 4, 5)
+        with self.assertRaises(ValueError):
+            randfunc_array(3, 4, 0)
+
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_randconj_array(self):
+        """Test rows of randconj_array are conjugates of f."""
+        f = randfunc("abcdefghij")
+        domain = sorted(f.domain)
+        for row in randconj_array(f, 20, seed=3):
+            g = Endofunction(zip(domain, map(domain.__getitem__, row)))
+            self.assertEqual(ConjugacyClass(f), ConjugacyClass(g))
+        if not hasattr(np.random, "SeedSequence"):
+            return
+        seeds = np.random.SeedSequence(4).spawn(2)
+        self.assertFalse((randconj_array(f, 20, seeds[0]) ==
+                          randconj_array(f, 20, seeds[1])).all())
+
 
 class CompositionTests(unittest.TestCase):
 
@@ -389,3 +459,65 @@ class FunctionEnumeratorTests(unittest.TestCase):
                 self.assertDomainsCorrect(Isomorphisms(d, c))
                 self.assertDomainsCorrect(TransformationMonoid(d))
                 self.assertDomainsCorrect(SymmetricGroup(d))
+
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_index_blocks(self):
+        """Test index blocks hold the enumerated functions in order."""
+        for (_, d), (_, c) in self.domranges:
+            mspaces = [Mappings(d, c)]
+            if len(c) == len(d):
+                mspaces.append(Isomorphisms(d, c))
+            for mspace in mspaces:
+                domain, codomain = map(sorted, [mspace.domain,
+                                                mspace.codomain])
+                for size in [1, 5, 4096]:
+                    funcs = []
+                    for block in mspace.index_blocks(size):
+                        self.assertLessEqual(len(block), size)
+                        funcs.extend(
+                            Function(zip(domain, map(codomain.__getitem__,
+                                                     row)))
+                            for row in block)
+                    self.assertEqual(list(mspace), funcs)
+        sums = SymmetricGroup(4).index_blocks(6, lambda b: b.sum())
+        self.assertEqual([36]*4, list(sums))
+        for mspace in [TransformationMonoid(3), SymmetricGroup(4)]:
+            rows = [tuple(row) for block in mspace.index_blocks()
+                    for row in block]
+            for start, stop in [(0, 0), (5, 6), (2, 19), (7, 100)]:
+                self.assertEqual(
+                    rows[start:stop],
+                    [tuple(row) for block in mspace.index_blocks(
+                        4, start=start, stop=stop) for row in block])
+
+    def test_getitem(self):
+        """Test indexing and slicing agree with enumeration."""
+        for (_, d), (_, c) in self.domranges:
+            mspaces = [Mappings(d, c)]
+            if len(c) == len(d):
+                mspaces.append(Isomorphisms(d, c))
+            for mspace in mspaces:
+                funcs = list(mspace)
+                for k in range(-len(funcs), len(funcs)):
+                    self.assertEqual(funcs[k], mspace[k])
+                for s in [slice(None), slice(1, -1), slice(-3, None, 2)]:
+                    self.assertEqual(funcs[s], mspace[s])
+                with self.assertRaises(IndexError):
+                    mspace[len(funcs)]
+        with self.assertRaises(TypeError):
+            TransformationMonoid(3)[1.0]
+        big = SymmetricGroup(20)
+        self.assertEqual(identity(20), big[0])
+        self.assertEqual(Permutation(zip(range(20), range(19, -1, -1))),
+                         big[-1])
+
+    def test_shard(self):
+        """Test shards partition the enumeration in order."""
+        for mspace in [TransformationMonoid(4), SymmetricGroup(5)]:
+            for nshards in [1, 3, 7, 200]:
+                funcs = []
+                for i in range(nshards):
+                    funcs.extend(mspace.shard(i, nshards))
+                self.assertEqual(list(mspace), funcs)
+        with self.assertRaises(ValueError):
+            TransformationMonoid(3).shard(3, 3)
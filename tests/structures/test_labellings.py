@@ -6,8 +6,10 @@ from funcstructs.combinat import multinomial_coefficient
 
 from funcstructs.structures.labellings import (
     equipartitions, equipartition_count, ordered_divisions,
-    set_partitions, set_partition_count, cycle_labellings,
-    cycle_index
+    set_partitions, set_partition_count, rank_set_partition,
+    unrank_set_partition, random_set_partition, cycle_labellings,
+    cycle_index, rank_cycle_labelling, unrank_cycle_labelling,
+    random_cycle_labelling, cycle_type_permutations
 )
 
 
@@ -87,3 +89,85 @@ class LabellingTests(unittest.TestCase):
             len(frozenset(cycle_labellings([2, 2], 5))),
             len(frozenset(cycle_labellings([2, 2, 1])))
         )
+
+    def test_shared_bins(self):
+        """Test shared bins agree with the usual output."""
+        for partition in self.partitions:
+            shared = list(ordered_divisions(partition, shared=True))
+            for bins in shared:
+                self.assertIs(shared[0], bins)
+            self.assertEqual(
+                list(ordered_divisions(partition)),
+                [tuple(map(frozenset, bins)) for bins in
+                 ordered_divisions(partition, shared=True)])
+        self.assertEqual(
+            list(set_partitions([2, 2, 1], 7)),
+            [frozenset(map(frozenset, bins[:-1])) for bins in
+             set_partitions([2, 2, 1], 7, shared=True)])
+        for bins in equipartitions("abcdef", 3, shared=True):
+            self.assertEqual(
+                sorted(min(b) for b in bins), list(map(min, bins)))
+        self.assertEqual([[[]]], list(ordered_divisions([0], shared=True)))
+        self.assertEqual([], list(set_partitions([2, 2], 3)))
+
+    def test_set_partition_rank_unrank(self):
+        """Test rank and unrank agree with the enumeration order."""
+        for partition, S in [([3, 2, 2, 1], None), ([2, 2], "abcde"),
+                             ([1, 1, 1], 5), ([4], 4), ([], 0)]:
+            divisions = list(set_partitions(partition, S))
+            n = None if S is None else len(S) if isinstance(S, str) else S
+            self.assertEqual(set_partition_count(partition, n),
+                             len(divisions))
+            for i, division in enumerate(divisions):
+                self.assertEqual(i, rank_set_partition(division, partition, S))
+                self.assertEqual(division,
+                                 unrank_set_partition(partition, i, S))
+            with self.assertRaises(IndexError):
+                unrank_set_partition(partition, len(divisions), S)
+            self.assertIn(random_set_partition(partition, S), divisions)
+        with self.assertRaises(ValueError):
+            rank_set_partition([{0, 1}, {1, 2}], [2, 2])
+
+    def test_cycle_labelling_rank_unrank(self):
+        """Test rank and unrank agree with the enumeration order."""
+        for partition, S in [([3, 2, 2, 1], None), ([3, 2], 6),
+                             ([4, 1], None)]:
+            labellings = list(cycle_labellings(partition, S))
+            self.assertEqual(cycle_index(partition, S), len(labellings))
+            for i, cycles in enumerate(labellings):
+                self.assertEqual(
+                    i, rank_cycle_labelling(cycles, partition, S))
+                self.assertEqual(
+                    cycles, unrank_cycle_labelling(partition, i, S))
+            self.assertIn(random_cycle_labelling(partition, S), labellings)
+        big = [5, 4, 3, 3, 2]
+        cycles = random_cycle_labelling(big, 30)
+        self.assertEqual(sorted(big), sorted(map(len, cycles)))
+        rank = rank_cycle_labelling(cycles, big, 30)
+        self.assertEqual(cycles, unrank_cycle_labelling(big, rank, 30))
+
+    def test_cycle_type_permutations(self):
+        """Test permutations of each cycle type are generated once each."""
+        for partition, S in [([3, 2, 2, 1], None), ([2, 2], "abcdef"),
+                             ([5], None), ([], ""), ([1], 3), ([2, 1], 4),
+                             ([3, 1, 1], 6), ([2, 2, 1], 6)]:
+            if S is None:
+                n = sum(partition)
+            else:
+                n = S if isinstance(S, int) else len(S)
+            perms = list(cycle_type_permutations(partition, S))
+            cycle_type = sorted(partition + [1]*(n - sum(partition)))
+            self.assertEqual(cycle_index(cycle_type), len(perms))
+            self.assertEqual(len(perms), len(set(perms)))
+            for perm in perms:
+                self.assertEqual(cycle_type,
+                                 sorted(map(len, perm.cycles())))
+
+    def test_cycle_type_permutation_changes(self):
+        """Test a single cycle's permutations change three images a step."""
+        previous = None
+        for perm in cycle_type_permutations([6], shared=True):
+            if previous is not None:
+                changes = sum(x != y for x, y in zip(perm, previous))
+                self.assertEqual(3, changes)
+            previous = perm[:]
@@ -4,7 +4,7 @@ from collections import Counter
 from itertools import product
 import platform
 
-from funcstructs.structures.multiset import Multiset
+from funcstructs.structures.multiset import Multiset, IntMultiset
 
 
 class MultisetTests(unittest.TestCase):
@@ -177,3 +177,87 @@ class MultisetTests(unittest.TestCase):
                     self.assertTypeEqual(l(), l(a) - r(b))
                     self.assertTypeEqual(l(a), l(a) & r(b))
                     self.assertTypeEqual(l(a), l(a) | r(b))
+
+    def test_mixed_sign_counters(self):
+        """Test operations with Counters having non-positive counts."""
+        c = Counter(a=-1, b=0, c=2, d=-3)
+        for op in ['__add__', '__sub__', '__and__', '__or__']:
+            for mset in self.msets + [Multiset("abcd")]:
+                self.assertEqual(
+                    getattr(Counter(mset), op)(c), getattr(mset, op)(c))
+        with self.assertRaises(TypeError):
+            self.abra + "abc"
+        with self.assertRaises(TypeError):
+            self.abra - {'a': 1}
+
+    def test_sum(self):
+        """Test Multiset.sum agrees with repeated addition."""
+        total = Multiset()
+        for mset in self.msets:
+            total += mset
+        self.assertTypeEqual(total, Multiset.sum(self.msets))
+        self.assertTypeEqual(Multiset(), Multiset.sum([]))
+        self.assertEqual(
+            Multiset("abracadabra"), Multiset.sum(["abra", "cad", "abra"]))
+
+
+class IntMultisetTests(unittest.TestCase):
+
+    lists = [[], [0], [3, 1, 1], [1, 2, 2, 3, 3, 3, 7], [5]*4 + [2]*3]
+
+    def test_interchangeable(self):
+        """Test IntMultisets are equal and hash equal to Multisets."""
+        for l in self.lists:
+            m = Multiset(l)
+            im = IntMultiset(l)
+            pairs = [(m, im), (im, m), (im, dict(m)), (im, IntMultiset(m))]
+            for a, b in pairs:
+                self.assertEqual(a, b)
+                self.assertFalse(a != b)
+            self.assertEqual(hash(m), hash(im))
+            self.assertEqual(dict(m), dict(im))
+            self.assertEqual(len(m), len(im))
+            self.assertEqual(sorted(m), sorted(im))
+            self.assertEqual(m.degeneracy(), im.degeneracy())
+            self.assertEqual(set(m.elements()), set(im.elements()))
+            self.assertEqual(1, len({m, im}))
+            self.assertEqual(im, eval(repr(im)))
+            self.assertIs(IntMultiset, type(eval(repr(im))))
+            self.assertNotEqual(im, IntMultiset(l + [1]))
+            self.assertNotEqual(im, Multiset(l + [1]))
+
+    def test_counts(self):
+        """Test IntMultisets are stored as trimmed count tuples."""
+        self.assertEqual((0, 2, 0, 1), IntMultiset([3, 1, 1]).counts)
+        self.assertEqual(
+            IntMultiset([3, 1, 1]), IntMultiset.fromcounts([0, 2, 0, 1, 0]))
+        self.assertEqual((), IntMultiset.fromcounts([0, 0]).counts)
+        im = IntMultiset([3, 1, 1])
+        self.assertEqual(2, im[1])
+        self.assertEqual(0, im.get(2, 0))
+        self.assertNotIn(2, im)
+        self.assertNotIn("a", im)
+        with self.assertRaises(KeyError):
+            im[0]
+        for bad in [[-1], ["a"], [1.0], {1: 0}, [True], {False: 2}]:
+            with self.assertRaises(TypeError):
+                IntMultiset(bad)
+        with self.assertRaises(TypeError):
+            IntMultiset.fromcounts([1, -1])
+
+    def test_binary_operations(self):
+        """Test IntMultiset arithmetic agrees with Multiset arithmetic."""
+        ops = [lambda a, b: a + b, lambda a, b: a - b,
+               lambda a, b: a & b, lambda a, b: a | b]
+        for l1, l2 in product(self.lists, repeat=2):
+            for op in ops:
+                expected = op(Multiset(l1), Multiset(l2))
+                result = op(IntMultiset(l1), IntMultiset(l2))
+                self.assertIs(IntMultiset, type(result))
+                self.assertEqual(expected, result)
+                for a, b in [(IntMultiset(l1), Multiset(l2)),
+                             (Multiset(l1), IntMultiset(l2))]:
+                    self.assertEqual(expected, op(a, b))
+                c = op(Counter(l1), IntMultiset(l2))
+                self.assertIs(Counter, type(c))
+                self.assertEqual(op(Counter(l1), Counter(l2)), c)
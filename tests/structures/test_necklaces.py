@@ -1,11 +1,17 @@
 import unittest
+import pickle
+from itertools import product
 
-from PADS import Lyndon
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from funcstructs.combinat import divisors
 
 from funcstructs.structures.necklaces import (
     periodicity,
+    smallest_rotation,
     Necklace,
     FixedContentNecklaces
 )
@@ -38,6 +44,16 @@ class PeriodicityTest(unittest.TestCase):
         for period, lst in zip(periods, lists):
             self.assertEqual(period, periodicity(lst))
 
+    def test_smallest_rotation(self):
+        """Test smallest rotations and periods against brute force."""
+        for n in range(1, 9):
+            for word in product(range(3), repeat=n):
+                rotations = [word[i:] + word[:i] for i in range(n)]
+                i, p = smallest_rotation(word)
+                self.assertEqual(min(rotations), rotations[i])
+                self.assertEqual(len(set(rotations)), p)
+                self.assertEqual(periodicity(word), p)
+
 
 class NecklaceTests(unittest.TestCase):
 
@@ -54,6 +70,27 @@ class NecklaceTests(unittest.TestCase):
         """Test that our hash is rotationally invariant"""
         self.assertEqual(hash(Necklace([1, 2, 3])), hash(Necklace([3, 1, 2])))
 
+    def test_degeneracy(self):
+        """Test degeneracy of necklaces however they are constructed."""
+        n = Necklace(iter("abcabcabc"))
+        self.assertEqual(("a", "b", "c")*3, tuple(n))
+        self.assertEqual(3, n.degeneracy())
+        self.assertEqual(3, pickle.loads(pickle.dumps(n)).degeneracy())
+        with self.assertRaises(AttributeError):
+            n.period = 7
+        self.assertEqual(1, Necklace(range(5)).degeneracy())
+        for necklace in FixedContentNecklaces(multiplicities=[4, 2, 6]):
+            self.assertEqual(
+                len(necklace)//periodicity(necklace), necklace.degeneracy())
+
+    def test_normalize_all(self):
+        """Test batch normalization agrees with the constructor."""
+        words = [[3, 1, 2], (2, 3, 1), "cab", (3, 1, 2), [1]]
+        necklaces = Necklace.normalize_all(words)
+        self.assertEqual([Necklace(word) for word in words], necklaces)
+        self.assertIs(necklaces[0], necklaces[3])
+        self.assertEqual([], Necklace.normalize_all([]))
+
 
 class FixedContentNecklaceTests(unittest.TestCase):
 
@@ -80,6 +117,19 @@ class FixedContentNecklaceTests(unittest.TestCase):
             nc = FixedContentNecklaces(multiplicities=p).cardinality()
             self.assertEqual(c, nc)
 
+    def test_modular_counts(self):
+        """Test counting necklaces by period modulo a prime."""
+        for p in [61, 1000003]:
+            for mults in [[3, 3, 2], [6, 12], [24, 36], [10, 20, 30]]:
+                necks = FixedContentNecklaces(multiplicities=mults)
+                self.assertEqual(
+                    [c % p for c in necks.count_by_period()],
+                    necks.count_by_period(p))
+                self.assertEqual(
+                    necks.cardinality() % p, necks.cardinality(p))
+        with self.assertRaises(ValueError):
+            FixedContentNecklaces(multiplicities=[3, 3]).cardinality(9)
+
     def test_enumeration_counts(self):
         """Test necklace counts for various bead sets."""
         beadsets = [[4, 4, 5, 5, 2, 2, 2, 2, 2, 2, 6, 6],
@@ -104,10 +154,60 @@ class FixedContentNecklaceTests(unittest.TestCase):
         for count in counts_by_period:
             self.assertEqual(0, count)
 
+    def test_strands(self):
+        """Test strands give the bead indices of the enumerated necklaces."""
+        necks = FixedContentNecklaces("aabbbcdd")
+        bead = necks.content.__getitem__
+        for necklace, strand in zip(necks, necks.strands()):
+            self.assertEqual(tuple(necklace), tuple(map(bead, strand)))
+        shared = list(necks.strands(shared=True))
+        self.assertEqual(necks.cardinality(), len(shared))
+        for strand in shared:
+            self.assertIs(shared[0], strand)
+
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_index_array(self):
+        """Test the rows of the index array are the strands."""
+        necks = FixedContentNecklaces(multiplicities=[3, 2, 4])
+        strands = necks.index_array()
+        self.assertEqual((necks.cardinality(), 9), strands.shape)
+        self.assertEqual(list(necks.strands()), list(map(tuple, strands)))
+
+    def test_rank_unrank(self):
+        """Test rank and unrank agree with the enumeration order."""
+        for beads in ["aabbbcdd", [1]*1 + [2]*2 + [3]*3, [0]*4 + [1]*6]:
+            necks = FixedContentNecklaces(beads)
+            for i, necklace in enumerate(necks):
+                self.assertEqual(i, necks.rank(necklace))
+                self.assertEqual(necklace, necks.unrank(i))
+            with self.assertRaises(IndexError):
+                necks.unrank(necks.cardinality())
+            elements = list(necks)
+            self.assertEqual(elements[-1], necks[-1])
+            self.assertEqual(elements[3:9:2], necks[3:9:2])
+            self.assertEqual(elements[2:], necks[2:])
+        with self.assertRaises(ValueError):
+            FixedContentNecklaces("aabb").rank(Necklace("abc"))
+
+    def test_random_element(self):
+        """Test sampling and ranking necklaces too numerous to enumerate."""
+        necks = FixedContentNecklaces(multiplicities=[12, 18])
+        necklace = necks.random_element()
+        self.assertIn(necklace, necks)
+        self.assertEqual(necklace, necks.unrank(necks.rank(necklace)))
+        self.assertEqual(0, necks.rank(Necklace([0]*12 + [1]*18)))
+        last = necks.cardinality() - 1
+        self.assertEqual(last, necks.rank(necks.unrank(last)))
+
     def test_ordering(self):
         """Test necklaces are lexicographically sorted"""
         necks = FixedContentNecklaces([1]*1 + [2]*2 + [3]*3)
+        previous = None
         for necklace in necks:
-            necklace = list(necklace)
-            normalized_necklace = Lyndon.SmallestRotation(necklace)
-            self.assertSequenceEqual(normalized_necklace, necklace)
+            necklace = tuple(necklace)
+            rotations = [necklace[i:] + necklace[:i]
+                         for i in range(len(necklace))]
+            self.assertEqual(min(rotations), necklace)
+            if previous is not None:
+                self.assertLess(previous, necklace)
+            previous = necklace
@@ -23,6 +23,16 @@ class TreeEnumerationTests(unittest.TestCase):
             self.assertEqual(count, len(set(TreeEnumerator(n))))
             self.assertEqual(count, TreeEnumerator(n).cardinality())
 
+    def test_modular_counts(self):
+        """Test counting trees modulo a prime."""
+        for p in [41, 1000003]:
+            for n in range(1, 41):
+                trees = TreeEnumerator(n)
+                self.assertEqual(trees.cardinality() % p, trees.cardinality(p))
+        for mod in [15, 21, 25, 5]:
+            with self.assertRaises(ValueError):
+                TreeEnumerator(8).cardinality(mod)
+
     def test_canonical(self):
         """Ensure the implementation correctly enumerates DominantSequences."""
         for tree in TreeEnumerator(9):